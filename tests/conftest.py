@@ -0,0 +1,45 @@
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+# translator.py 是单文件脚本, 直接从仓库根目录导入
+sys.path.append(str(Path(__file__).resolve().parent.parent))
+
+import translator  # noqa: E402
+
+
+# 配置, 缓存和健康状态都放到临时 HOME 下, 测试之间互不影响
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    monkeypatch.delenv("all_proxy", raising=False)
+    monkeypatch.delenv("TRANSLATOR_DAEMON", raising=False)
+    translator.load_config.cache_clear()
+    yield tmp_path
+    translator.load_config.cache_clear()
+    translator.HttpPool.use(None)
+    translator.CircuitBreaker._breakers.clear()
+    translator.RateLimiter._limiters.clear()
+
+
+def write_config(home, config):
+    path = home / ".config" / "translator" / "config.toml"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as fh:
+        for section, values in config.items():
+            fh.write(f"[{section}]\n")
+            for key, value in values.items():
+                fh.write(f"{key} = {json.dumps(value)}\n")
+    translator.load_config.cache_clear()
+
+
+# 本地模拟服务, 所有引擎的配置都指向它
+@pytest.fixture
+def provider(home):
+    mock = translator.MockProvider(latency=0.0)
+    mock.base = mock.start()
+    write_config(home, mock.config(mock.base))
+    yield mock
+    mock.stop()
@@ -0,0 +1,63 @@
+import translator
+from conftest import write_config
+
+
+def auto_config(provider, home, engines):
+    config = provider.config(provider.base)
+    config["auto"] = {"engines": engines}
+    write_config(home, config)
+
+
+def test_auto_skips_word_only_engines_for_sentences(provider, home):
+    auto_config(provider, home, "bing,google")
+    names = [t._name for t in translator.auto_engines("en", "zh", "good morning")]
+    assert names == ["google"]
+    names = [t._name for t in translator.auto_engines("en", "zh", "morning")]
+    assert names == ["bingdict", "google"]
+
+
+def test_auto_treats_empty_result_as_failure(provider, home, monkeypatch):
+    auto_config(provider, home, "bing,google")
+
+    def empty(self, sl, tl, text):
+        res = self.create_translation(sl, tl, text)
+        return self.select_fields(res)
+
+    monkeypatch.setattr(translator.BingDict, "lookup", empty)
+    monkeypatch.setattr(translator.EngineHealth, "rank", lambda self, engines: engines)
+    res = translator.translate_auto("en", "zh", "morning", cache=False)
+    assert res["engine"] == "google"
+    assert res["definition"] == "译:morning"
+
+
+def test_auto_batch_never_picks_word_only_engines(provider, home, capsys, monkeypatch):
+    import io
+    import json
+
+    auto_config(provider, home, "bing,google")
+    monkeypatch.setattr(translator.EngineHealth, "rank", lambda self, engines: engines)
+    monkeypatch.setattr("sys.stdin", io.StringIO("good morning\nsee you soon\n"))
+    argv = ["translator.py", "--no-cache", "--engine=auto", "--to=zh", "--batch"]
+    assert translator.main(argv) == 0
+    records = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r["engine"] for r in records] == ["google", "google"]
+
+
+def test_race_skips_empty_results(provider, home, monkeypatch):
+    import time
+
+    def empty(self, sl, tl, text):
+        return self.select_fields(self.create_translation(sl, tl, text))
+
+    lookup = translator.GoogleTranslator.lookup
+
+    def slow(self, sl, tl, text):
+        time.sleep(0.2)
+        return lookup(self, sl, tl, text)
+
+    monkeypatch.setattr(translator.BingDict, "lookup", empty)
+    monkeypatch.setattr(translator.GoogleTranslator, "lookup", slow)
+    text = "see you soon"
+    res = translator.translate_race(["bing", "google"], "en", "zh", text)
+    assert res["engine"] == "google"
+    assert res["definition"] == "译:see you soon"
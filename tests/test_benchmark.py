@@ -0,0 +1,22 @@
+import translator
+
+
+def test_benchmark_batches_and_restores_registries():
+    breakers = dict(translator.CircuitBreaker._breakers)
+    limiters = dict(translator.RateLimiter._limiters)
+    records = translator.run_benchmark(
+        ["deeplx", "baidu"], ["batch", "sync"], count=20, workers=4, latency=0
+    )
+    assert [r["errors"] for r in records] == [0, 0, 0, 0]
+    batch = [r for r in records if r["mode"] == "batch"]
+    assert all(r["upstream"] < r["results"] for r in batch)
+    assert translator.CircuitBreaker._breakers == breakers
+    assert translator.RateLimiter._limiters == limiters
+    assert translator.CONFIG_PATH == "~/.config/translator/config.toml"
+
+
+def test_benchmark_counts_untranslated_results_as_errors():
+    assert not translator._benchmark_ok({"definition": "line 2", "explain": None})
+    assert not translator._benchmark_ok(None)
+    assert translator._benchmark_ok({"definition": "译:line 2"})
+    assert translator._benchmark_ok({"definition": None, "explain": ["n. 文本"]})
@@ -0,0 +1,35 @@
+import pytest
+
+import translator
+
+
+@pytest.mark.parametrize("name", ["hover", "page"])
+@pytest.mark.parametrize("chunk", [1, 7, 300, 8192])
+def test_incremental_parser_matches_whole_page(name, chunk):
+    content = translator._bingdict_samples()[name]
+    engine = translator.BingDict.__new__(translator.BingDict)
+    html = content.decode("utf-8")
+    expected = (engine.get_phonetic(html), engine.get_explain(html))
+    resp = translator.HttpResponse(200, {}, content)
+    parser = translator.BingDictParser().feed_response(resp, chunk)
+    assert (parser.phonetic, parser.explain) == expected
+
+
+def test_read_page_streams_only_large_pages(monkeypatch):
+    engine = translator.BingDict.__new__(translator.BingDict)
+    streamed = []
+    feed = translator.BingDictParser.feed_response
+
+    def spy(self, resp, chunk_size=8192):
+        streamed.append(len(resp.content))
+        return feed(self, resp, chunk_size)
+
+    monkeypatch.setattr(translator.BingDictParser, "feed_response", spy)
+    for content in translator._bingdict_samples().values():
+        headers = {"Content-Length": str(len(content))}
+        phonetic, explain = engine.read_page(
+            translator.HttpResponse(200, headers, content)
+        )
+        assert phonetic == "heˈloʊ"
+        assert len(explain) == 4
+    assert streamed == [len(translator._bingdict_samples()["page"])]
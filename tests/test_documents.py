@@ -0,0 +1,102 @@
+import json
+
+import translator
+
+
+def fake(doc):
+    return doc.render([f"<{x}>" for x in doc.segments])
+
+
+def test_markdown_keeps_code_and_markup():
+    content = (
+        "---\ntitle: Demo\n---\n# Getting started\n\n"
+        "Install the tool.\n  - [x] Done item\n\n"
+        "```python\nprint('hello world')\n```\n\n"
+        "    indented code\n\n"
+        "| Name | Value |\n|------|-------|\n| Speed | 42 |\n\n"
+        "[ref]: https://example.com\n"
+    )
+    doc = translator.parse_markdown(content)
+    assert doc.segments == [
+        "Getting started",
+        "Install the tool.",
+        "Done item",
+        "Name",
+        "Value",
+        "Speed",
+    ]
+    out = fake(doc)
+    assert "# <Getting started>\n" in out
+    assert "  - [x] <Done item>\n" in out
+    assert "print('hello world')" in out
+    assert "    indented code\n" in out
+    assert "| <Speed> | 42 |" in out
+    assert out.count("\n") == content.count("\n")
+
+
+def test_srt_translates_text_lines_only():
+    content = (
+        "1\r\n00:00:01,000 --> 00:00:02,000\r\nHello there\r\n\r\n"
+        "2\r\n00:00:03,000 --> 00:00:04,000\r\nHello there\r\n"
+    )
+    doc = translator.parse_srt(content)
+    assert doc.segments == ["Hello there", "Hello there"]
+    assert fake(doc) == content.replace("Hello there", "<Hello there>")
+
+
+def test_po_fills_empty_msgstr_and_keeps_existing():
+    content = (
+        'msgid ""\nmsgstr ""\n"Content-Type: text/plain; charset=UTF-8\\n"\n\n'
+        'msgid "Open file"\nmsgstr ""\n\n'
+        'msgid "Done"\nmsgstr "Fertig"\n\n'
+        'msgid ""\n"Say \\"hi\\"\\n"\nmsgstr ""\n\n'
+        'msgid "One file"\nmsgid_plural "%d files"\nmsgstr[0] ""\nmsgstr[1] ""\n'
+    )
+    doc = translator.parse_po(content)
+    assert doc.segments == ["Open file", 'Say "hi"', "One file", "%d files"]
+    out = fake(doc)
+    assert 'msgstr "<Open file>"\n' in out
+    assert 'msgstr "Fertig"\n' in out
+    assert 'msgstr "<Say \\"hi\\">\\n"\n' in out
+    assert 'msgstr[1] "<%d files>"\n' in out
+    assert out.endswith("\n")
+
+
+def test_json_translates_values_in_place():
+    content = '{\n  "a": "Hello",\n  "b": {"c": "World", "n": 3, "k": "42"},\n  "l": ["Save", "Quit"]\n}\n'
+    doc = translator.parse_json(content)
+    assert doc.segments == ["Hello", "World", "Save", "Quit"]
+    out = doc.render(['Hal"lo', "Welt", "Sichern", "Ende"])
+    assert out == (
+        '{\n  "a": "Hal\\"lo",\n  "b": {"c": "Welt", "n": 3, "k": "42"},\n'
+        '  "l": ["Sichern", "Ende"]\n}\n'
+    )
+    assert json.loads(out)["a"] == 'Hal"lo'
+
+
+def test_translate_file_is_incremental(provider, home):
+    src = home / "doc.md"
+    dst = str(home / "doc.de.md")
+    src.write_text("# Title\n\nFirst line.\n\nSecond line.\n", encoding="utf-8")
+    engine = translator.GoogleTranslator(cache=False, fields=["definition"])
+    stats = translator.translate_file(engine, "en", "de", str(src), dst)
+    assert stats["translated"] == 3
+    text = open(dst, encoding="utf-8").read()
+    assert text == "# 译:Title\n\n译:First line.\n\n译:Second line.\n"
+    src.write_text("# Title\n\nFirst line.\n\nChanged line.\n", encoding="utf-8")
+    hits = provider.hits
+    stats = translator.translate_file(engine, "en", "de", str(src), dst)
+    assert (stats["translated"], stats["reused"]) == (1, 2)
+    assert provider.hits - hits == 1
+
+
+def test_file_mode_requests_only_the_definition(provider, home):
+    src = home / "ui.json"
+    src.write_text('{"open": "Open file"}', encoding="utf-8")
+    rc = translator.main(["translator.py", "--no-cache", "--to=de", f"--file={src}"])
+    assert rc == 0
+    state = json.loads((home / "ui.de.json.tstate").read_text(encoding="utf-8"))
+    assert state["engine"] == "google:fields=definition:dt=t"
+    assert (home / "ui.de.json").read_text(
+        encoding="utf-8"
+    ) == '{"open": "译:Open file"}'
@@ -0,0 +1,59 @@
+import sys
+
+import translator
+
+
+def make_store(tmp_path):
+    return translator.FixtureStore(str(tmp_path), "replay")
+
+
+def test_key_keeps_repeated_query_parameters(tmp_path):
+    store = make_store(tmp_path)
+    url = "https://api.example.com/translate?api-version=3.0"
+    many = store.key("POST", url + "&to=de&to=ja", {})
+    one = store.key("POST", url + "&to=ja", {})
+    assert many != one
+    assert many == store.key("POST", url + "&to=ja&to=de", {})
+
+
+def test_key_distinguishes_google_dt_lists(tmp_path):
+    store = make_store(tmp_path)
+    url = "https://h/translate_a/single?client=gtx&sl=en&tl=de"
+    full = store.key("GET", url + "&dt=at&dt=bd&dt=t&q=hi", {})
+    short = store.key("GET", url + "&dt=t&q=hi", {})
+    assert full != short
+
+
+def test_key_ignores_salt_sign_and_headers(tmp_path):
+    store = make_store(tmp_path)
+    url = "https://fanyi-api.example.com/api/trans/vip/translate"
+    a = {"data": {"q": "hi", "salt": "1", "sign": "x"}, "headers": {"X": "1"}}
+    b = {"data": {"q": "hi", "salt": "2", "sign": "y"}, "headers": {"X": "2"}}
+    assert store.key("POST", url, a) == store.key("POST", url, b)
+    c = {"data": {"q": "ho", "salt": "1", "sign": "x"}}
+    assert store.key("POST", url, a) != store.key("POST", url, c)
+
+
+def test_key_merges_params_with_url_query(tmp_path):
+    store = make_store(tmp_path)
+    a = store.key("GET", "https://h/ajax.php?a=fy", {"params": {"w": "hi"}})
+    b = store.key("GET", "https://h/ajax.php?w=hi&a=fy", {})
+    assert a == b
+
+
+def test_http2_without_httpx_falls_back_to_requests(
+    provider, home, capsys, monkeypatch
+):
+    from conftest import write_config
+
+    config = provider.config(provider.base)
+    config["default"]["http2"] = True
+    write_config(home, config)
+    monkeypatch.setitem(sys.modules, "httpx", None)
+    monkeypatch.setattr(translator.HttpPool, "_http2_warned", False)
+    for text in ("hello", "world"):
+        rc = translator.main(["translator.py", "--no-cache", "--engine=google", text])
+        assert rc == 0
+    out = capsys.readouterr()
+    assert "译:hello" in out.out and "译:world" in out.out
+    assert out.err.count("http2 disabled") == 1
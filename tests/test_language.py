@@ -0,0 +1,57 @@
+import pytest
+
+import translator
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "come",
+        "Cancel",
+        "decode",
+        "data",
+        "man",
+        "chef",
+        "delta",
+        "I love Paris",
+        "Open file",
+        "this is a simple test of the system",
+        "Error while reading the configuration file",
+    ],
+)
+def test_english_words_and_ui_strings(text):
+    assert translator.detect_language(text) == "en-US"
+
+
+@pytest.mark.parametrize(
+    "text", ["Deleted 7 files from /tmp", "Please enter your password again"]
+)
+def test_ambiguous_ascii_is_left_to_the_server(text):
+    assert translator.detect_language(text) in ("en-US", "auto")
+
+
+@pytest.mark.parametrize(
+    "text, lang",
+    [
+        ("Ich habe heute keine Zeit", "de"),
+        ("el perro come la comida en la casa", "es"),
+        ("je ne sais pas ce que tu veux dire", "fr"),
+        ("io sono molto stanco oggi", "it"),
+        ("ik heb geen tijd vandaag", "nl"),
+        ("Grüße aus Berlin", "de"),
+        ("São Paulo é uma cidade enorme", "pt"),
+        ("你好世界", "zh-CN"),
+        ("こんにちは世界", "ja"),
+        ("안녕하세요", "ko"),
+        ("Привет мир", "ru"),
+    ],
+)
+def test_detects_other_languages(text, lang):
+    assert translator.detect_language(text) == lang
+
+
+def test_guess_language_sends_auto_when_unsure():
+    bt = translator.BasicTranslator("test")
+    assert bt.guess_language("auto", "auto", "Cancel") == ("en-US", "zh-CN")
+    assert bt.guess_language("auto", "auto", "你好") == ("zh-CN", "en-US")
+    assert bt.guess_language("auto", "auto", "café") == ("auto", "zh-CN")
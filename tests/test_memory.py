@@ -0,0 +1,39 @@
+import pytest
+
+import translator
+
+
+@pytest.fixture
+def memory(tmp_path):
+    return translator.TranslationMemory(tmp_path / "memory.db")
+
+
+def result(text, definition):
+    return {"text": text, "sl": "en", "tl": "zh-CN", "definition": definition}
+
+
+@pytest.mark.parametrize(
+    "text, definition, reuse, expected",
+    [
+        ("Deleted 7 files", "已删除7个文件", "Deleted 12 files", "已删除12个文件"),
+        ("Deleted 7 files", "已删除 7 个文件", "Deleted 12 files", "已删除 12 个文件"),
+        ("Hello {name}", "你好{name}", "Hello {user}", "你好{user}"),
+        (
+            "See https://a.example/x",
+            "见https://a.example/x",
+            "See https://b.example/y",
+            "见https://b.example/y",
+        ),
+    ],
+)
+def test_values_next_to_cjk_are_memorized(memory, text, definition, reuse, expected):
+    assert memory.add("google", "en", "zh-CN", text, result(text, definition))
+    res = memory.match("google", "en", "zh-CN", reuse)
+    assert res["definition"] == expected
+    assert res["memory"] == 1.0
+
+
+def test_number_inside_longer_number_is_not_masked(memory):
+    text = "Deleted 7 files"
+    assert not memory.add("google", "en", "zh-CN", text, result(text, "已删除17个文件"))
+    assert not memory.add("google", "en", "zh-CN", text, result(text, "已删除7.5个"))
@@ -0,0 +1,106 @@
+import json
+
+import pytest
+
+import translator
+
+
+def run(capsys, *argv):
+    rc = translator.main(["translator.py", "--no-cache", *argv])
+    return rc, capsys.readouterr()
+
+
+# 先对模拟服务录制, 停掉服务后回放, 回放必须完全离线
+@pytest.fixture
+def record(provider, home, capsys):
+    fixtures = home / "fixtures"
+
+    def record(*argv):
+        rc, out = run(capsys, f"--record={fixtures}", *argv)
+        assert rc == 0, out.err
+        return out.out
+
+    yield record, fixtures
+
+
+def test_replay_multiple_targets_in_one_request(record, provider, capsys):
+    rec, fixtures = record
+    expected = rec("--engine=azure", "--to=de,fr,ja", "-json", "hello")
+    rec("--engine=azure", "--to=ja", "-json", "hello")
+    provider.stop()
+    hits = provider.hits
+    rc, out = run(
+        capsys,
+        f"--replay={fixtures}",
+        "--engine=azure",
+        "--to=de,fr,ja",
+        "-json",
+        "hello",
+    )
+    assert rc == 0, out.err
+    assert out.out == expected
+    assert set(json.loads(expected)) == {"de", "fr", "ja"}
+    assert provider.hits == hits
+
+
+def test_replay_keeps_google_dt_variants_apart(record, provider, capsys):
+    rec, fixtures = record
+    full = rec("--to=de", "--format=jsonl", "hello")
+    short = rec("--to=de", "--fields=definition", "--format=jsonl", "hello")
+    provider.stop()
+    rc, out = run(capsys, f"--replay={fixtures}", "--to=de", "--format=jsonl", "hello")
+    assert out.out == full
+    rc, out = run(
+        capsys,
+        f"--replay={fixtures}",
+        "--to=de",
+        "--fields=definition",
+        "--format=jsonl",
+        "hello",
+    )
+    assert out.out == short
+
+
+def test_failed_target_does_not_drop_the_others(record, provider, capsys):
+    rec, fixtures = record
+    rec("--to=de", "-json", "hello")
+    provider.stop()
+    rc, out = run(capsys, f"--replay={fixtures}", "--to=de,fr", "-json", "hello")
+    results = json.loads(out.out)
+    assert results["de"]["definition"] == "译:hello"
+    assert results["fr"] is None
+    assert "no fixture" in out.err
+
+
+def test_replay_signed_engines_and_batches(record, provider, home, capsys, monkeypatch):
+    import io
+
+    rec, fixtures = record
+    lines = "".join(f"line {i}\n" for i in range(20))
+    outputs = {}
+    for name in ("baidu", "youdao", "deeplx"):
+        monkeypatch.setattr("sys.stdin", io.StringIO(lines))
+        outputs[name] = rec(f"--engine={name}", "--to=zh", "--batch")
+    provider.stop()
+    for name, expected in outputs.items():
+        monkeypatch.setattr("sys.stdin", io.StringIO(lines))
+        rc, out = run(
+            capsys,
+            f"--replay={fixtures}",
+            f"--engine={name}",
+            "--to=zh",
+            "--batch",
+            "--workers=4",
+        )
+        assert out.out == expected
+        assert len(out.out.splitlines()) == 20
+
+
+def test_results_report_normalized_languages(provider, capsys):
+    for name in ("google", "azure", "baidu", "deeplx", "bing", "ciba", "youdao"):
+        rc, out = run(capsys, f"--engine={name}", "-json", "hello")
+        res = json.loads(out.out)
+        assert (res["sl"], res["tl"]) == ("en-US", "zh-CN"), name
+    engine = translator.DeepLXTranslator(cache=False)
+    for res in engine.translate_many("auto", "auto", ["one", "two", "three"]):
+        assert (res["sl"], res["tl"]) == ("en-US", "zh-CN")
@@ -0,0 +1,64 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+import translator
+
+
+def test_concurrent_threads_share_one_call():
+    flight = translator.SingleFlight()
+    calls = []
+    gate = threading.Event()
+
+    def fn():
+        calls.append(1)
+        gate.wait(5)
+        return {"definition": "x", "explain": ["a"]}
+
+    results = []
+    threads = [
+        threading.Thread(target=lambda: results.append(flight.do("k", fn)))
+        for _ in range(8)
+    ]
+    for t in threads:
+        t.start()
+    time.sleep(0.1)
+    gate.set()
+    for t in threads:
+        t.join(5)
+    assert len(calls) == 1
+    assert len(results) == 8
+    assert all(r == {"definition": "x", "explain": ["a"]} for r in results)
+    # 等待方拿到副本, 修改不影响其他调用方
+    results[0]["explain"].append("b")
+    assert sum(r["explain"] == ["a"] for r in results) == 7
+
+
+def test_errors_reach_waiters_and_key_is_released():
+    flight = translator.SingleFlight()
+    call, leader = flight.claim("k")
+    assert leader
+    other, leader = flight.claim("k")
+    assert other is call and not leader
+    flight.finish("k", call, error=ValueError("boom"))
+    with pytest.raises(ValueError):
+        flight.wait(other)
+    assert flight.do("k", lambda: 42) == 42
+
+
+def test_coroutines_share_one_call():
+    flight = translator.SingleFlight()
+    calls = []
+
+    async def fn():
+        calls.append(1)
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def main():
+        return await asyncio.gather(*(flight.ado("k", fn) for _ in range(5)))
+
+    assert asyncio.run(main()) == ["done"] * 5
+    assert len(calls) == 1
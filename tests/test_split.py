@@ -0,0 +1,58 @@
+import pytest
+
+import translator
+
+
+def join(chunks):
+    return "".join(content + sep for content, sep in chunks)
+
+
+def test_short_text_is_one_chunk():
+    assert translator._split_text("hello world", 100, 0) == [("hello world", "")]
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "First paragraph here.\n\nSecond paragraph here.\n\n  Third one.",
+        "line one\nline two\nline three\nline four",
+        "One sentence. Another one! A question? 第一句。第二句！",
+        "a, b, c: d, e, f，g、h",
+        "word " * 40,
+        "x" * 95,
+    ],
+)
+def test_chunks_respect_limit_and_rejoin(text):
+    chunks = translator._split_text(text, 20, 0)
+    assert join(chunks) == text
+    assert all(len(content) <= 20 for content, _ in chunks)
+
+
+def test_prefers_paragraphs_over_sentences():
+    text = "Aaa. Bbb.\n\nCcc. Ddd."
+    assert translator._split_text(text, 12, 0) == [
+        ("Aaa. Bbb.", "\n\n"),
+        ("Ccc. Ddd.", ""),
+    ]
+
+
+def test_separators_stay_with_preceding_chunk():
+    chunks = translator._split_text("One. Two. Three.", 6, 0)
+    assert chunks == [("One.", " "), ("Two.", " "), ("Three.", "")]
+
+
+def test_batch_lookup_splits_long_texts(provider, home):
+    from conftest import write_config
+
+    config = provider.config(provider.base)
+    config["google"]["max_chars"] = 40
+    write_config(home, config)
+    text = "The first sentence is here. The second one follows. And a third."
+    engine = translator.GoogleTranslator(cache=False)
+    single = engine.lookup("en", "zh", text)
+    hits = provider.hits
+    assert hits == len(engine.split_text(text)) == 2
+    results = engine.lookup_many("en", "zh", [text, "short"])
+    assert provider.hits - hits == 3
+    assert results[0] == single
+    assert results[1]["definition"] == "译:short"
@@ -6,24 +6,27 @@
 # requires-python = ">=3.14"
 # dependencies = [
 #     "requests",
+#     "aiohttp",
+#     "msgpack",
+#     "httpx[http2]",
 # ]
 # ///
 
 
-import copy
-import hashlib
+import contextvars
+import functools
 import json
 import os
-import random
 import re
 import sys
+import threading
 import time
 from pathlib import Path
 from typing import Any, Dict, List, Optional, Tuple, override
 from urllib.parse import quote, quote_plus, unquote, unquote_plus
 
-import tomllib
-import pprint
+# 启动耗时统计 (--profile-startup): 其余依赖在用到时才导入
+_MODULE_START = time.perf_counter()
 
 
 # ----------------------------------------------------------------------
@@ -85,52 +88,395 @@ GREEN = "\033[92m"
 BLUE = "\033[94m"
 
 
+# ----------------------------------------------------------------------
+# 配置文件
+# ----------------------------------------------------------------------
+CONFIG_PATH = "~/.config/translator/config.toml"
+
+
+def load_toml(config_path: Optional[str | Path]) -> Optional[Dict[str, Dict[str, str]]]:
+    if not config_path:
+        return None
+    try:
+        path = Path(config_path).expanduser()
+    except TypeError:
+        return None
+    if not path.exists():
+        return None
+    import tomllib
+
+    try:
+        with path.open("rb") as fh:
+            raw = tomllib.load(fh)
+    except OSError:
+        return None
+
+    config: Dict[str, Dict[str, str]] = {}
+    for sect, values in raw.items():
+        if not isinstance(values, dict):
+            continue
+        section = config.setdefault(str(sect).lower(), {})
+        for key, val in values.items():
+            section[str(key).lower()] = "" if val is None else str(val)
+    config.setdefault("default", {})
+    return config
+
+
+# 进程内只解析一次
+@functools.cache
+def load_config() -> Optional[Dict[str, Dict[str, str]]]:
+    return load_toml(CONFIG_PATH)
+
+
+# ----------------------------------------------------------------------
+# 结果字段: 所有引擎返回同样的键, 总是包含 BASE_FIELDS, 其余字段可以用
+# fields 选项按需选择, 引擎不提供的字段为 None
+# ----------------------------------------------------------------------
+BASE_FIELDS = ("engine", "sl", "tl", "text")
+FIELDS = ("phonetic", "definition", "explain", "detail", "alternative")
+
+# 旧版本中 Azure/Baidu/DeepLX 的译文字段, 现在统一放在 definition
+_FIELD_ALIASES = {"translation": "definition"}
+
+
+def parse_fields(fields: Any) -> Optional[frozenset]:
+    if not fields:
+        return None
+    if isinstance(fields, str):
+        fields = fields.split(",")
+    fields = (str(x).strip() for x in fields)
+    return frozenset(_FIELD_ALIASES.get(x, x) for x in fields if x)
+
+
+# ----------------------------------------------------------------------
+# 请求计时: translate 期间 request/parse 把各阶段耗时, 收发字节数, 状态码和
+# 重试次数记入当前记录, 结束时交给注册的钩子 (--stats, --trace, 指标导出).
+# 没有钩子时不记录
+# ----------------------------------------------------------------------
+_TRACE: contextvars.ContextVar[Optional[Dict[str, Any]]] = contextvars.ContextVar(
+    "translator_trace", default=None
+)
+
+
+class Instrument:
+    """Context manager producing one trace record per translate call.
+
+    Record keys: ts, engine, op, sl, tl, chars, requests, retries, status,
+    bytes_out, bytes_in, error and phases (seconds by phase name: prepare,
+    ratelimit, network, server, download, parse, total, ...). ``server`` is
+    the time until response headers arrive, including connect and TLS.
+    """
+
+    hooks: List[Any] = []
+
+    def __init__(self, engine: str, op: str, sl: str, tl: str, chars: int) -> None:
+        self.args = (engine, op, sl, tl, chars)
+        self.record: Optional[Dict[str, Any]] = None
+
+    def __enter__(self) -> Optional[Dict[str, Any]]:
+        if not Instrument.hooks:
+            return None
+        engine, op, sl, tl, chars = self.args
+        self.record = {
+            "ts": time.time(),
+            "engine": engine,
+            "op": op,
+            "sl": sl,
+            "tl": tl,
+            "chars": chars,
+            "requests": 0,
+            "retries": 0,
+            "status": None,
+            "bytes_out": 0,
+            "bytes_in": 0,
+            "error": None,
+            "phases": {},
+        }
+        self.token = _TRACE.set(self.record)
+        self.start = time.perf_counter()
+        return self.record
+
+    def __exit__(self, kind: Any, value: Any, tb: Any) -> bool:
+        record = self.record
+        if record is None:
+            return False
+        record["phases"]["total"] = time.perf_counter() - self.start
+        if value is not None:
+            record["error"] = "{}: {}".format(type(value).__name__, value)
+        _TRACE.reset(self.token)
+        for hook in list(Instrument.hooks):
+            try:
+                hook(record)
+            except Exception:
+                pass
+        return False
+
+    @classmethod
+    def add_hook(cls, hook: Any) -> None:
+        if hook not in cls.hooks:
+            cls.hooks.append(hook)
+
+    @classmethod
+    def remove_hook(cls, hook: Any) -> None:
+        if hook in cls.hooks:
+            cls.hooks.remove(hook)
+
+
+# 计入当前记录的一个阶段, 同名阶段累加
+class TracePhase:
+    def __init__(self, name: str) -> None:
+        self.name = name
+
+    def __enter__(self) -> None:
+        self.record = _TRACE.get()
+        if self.record is not None:
+            self.start = time.perf_counter()
+
+    def __exit__(self, kind: Any, value: Any, tb: Any) -> bool:
+        if self.record is not None:
+            add_phase(self.record, self.name, time.perf_counter() - self.start)
+        return False
+
+
+def add_phase(record: Dict[str, Any], name: str, seconds: float) -> None:
+    phases = record["phases"]
+    phases[name] = phases.get(name, 0.0) + seconds
+
+
+def request_size(url: str, data: Any = None, body: Any = None) -> int:
+    from urllib.parse import urlencode
+
+    size = len(url)
+    if isinstance(data, dict):
+        data = urlencode(data, doseq=True)
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if data is not None:
+        size += len(data)
+    if body is not None:
+        size += len(json.dumps(body))
+    return size
+
+
+# 记录一次 HTTP 往返; server 为收到响应头的耗时, 同步请求取 requests 的 elapsed
+def record_request(
+    record: Optional[Dict[str, Any]],
+    started: float,
+    size: int,
+    resp: Any = None,
+    server: Optional[float] = None,
+    received: Optional[int] = None,
+) -> None:
+    if record is None:
+        return
+    cost = time.perf_counter() - started
+    record["requests"] += 1
+    record["bytes_out"] += size
+    add_phase(record, "network", cost)
+    if resp is None:
+        record["status"] = "error"
+        return
+    record["status"] = resp.status_code
+    # 流式响应还没有读取, 按 Content-Length 计算
+    if received is None:
+        received = len(resp.content or b"")
+    record["bytes_in"] += received
+    if server is None and getattr(resp, "elapsed", None) is not None:
+        server = resp.elapsed.total_seconds()
+    if server is not None:
+        add_phase(record, "server", server)
+        add_phase(record, "download", max(0.0, cost - server))
+
+
+class Metrics:
+    """Per-engine counters and latency histograms fed by Instrument records.
+
+    ``render()`` produces Prometheus text exposition, ``summary()`` the
+    table printed by --stats.
+    """
+
+    BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+    def __init__(self, recent: int = 10000) -> None:
+        self._lock = threading.Lock()
+        self._recent = recent
+        self.engines: Dict[str, Dict[str, Any]] = {}
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        from collections import deque
+
+        total = record["phases"].get("total", 0.0)
+        with self._lock:
+            m = self.engines.get(record["engine"])
+            if m is None:
+                m = self.engines[record["engine"]] = {
+                    "calls": 0,
+                    "errors": 0,
+                    "requests": 0,
+                    "retries": 0,
+                    "bytes_out": 0,
+                    "bytes_in": 0,
+                    "status": {},
+                    "phases": {},
+                    "buckets": [0] * len(self.BUCKETS),
+                    "sum": 0.0,
+                    "recent": deque(maxlen=self._recent),
+                }
+            m["calls"] += 1
+            m["errors"] += 1 if record["error"] else 0
+            for key in ("requests", "retries", "bytes_out", "bytes_in"):
+                m[key] += record[key]
+            if record["requests"]:
+                status = str(record["status"])
+                m["status"][status] = m["status"].get(status, 0) + 1
+            for name, seconds in record["phases"].items():
+                m["phases"][name] = m["phases"].get(name, 0.0) + seconds
+            for i, bound in enumerate(self.BUCKETS):
+                if total <= bound:
+                    m["buckets"][i] += 1
+            m["sum"] += total
+            m["recent"].append(total)
+
+    def render(self) -> str:
+        out: List[str] = []
+
+        def family(name: str, kind: str, doc: str) -> None:
+            out.append(f"# HELP translator_{name} {doc}")
+            out.append(f"# TYPE translator_{name} {kind}")
+
+        with self._lock:
+            engines = sorted(self.engines.items())
+            family("calls_total", "counter", "Translate calls that missed the cache.")
+            for name, m in engines:
+                out.append(f'translator_calls_total{{engine="{name}"}} {m["calls"]}')
+            family("errors_total", "counter", "Translate calls that raised.")
+            for name, m in engines:
+                out.append(f'translator_errors_total{{engine="{name}"}} {m["errors"]}')
+            family("http_requests_total", "counter", "HTTP round trips by status.")
+            for name, m in engines:
+                for status, n in sorted(m["status"].items()):
+                    labels = f'engine="{name}",status="{status}"'
+                    out.append(f"translator_http_requests_total{{{labels}}} {n}")
+            family("retries_total", "counter", "Retried HTTP requests.")
+            for name, m in engines:
+                out.append(
+                    f'translator_retries_total{{engine="{name}"}} {m["retries"]}'
+                )
+            family("bytes_sent_total", "counter", "Request bytes (URL and body).")
+            for name, m in engines:
+                out.append(
+                    f'translator_bytes_sent_total{{engine="{name}"}} {m["bytes_out"]}'
+                )
+            family("bytes_received_total", "counter", "Response body bytes.")
+            for name, m in engines:
+                out.append(
+                    f'translator_bytes_received_total{{engine="{name}"}} {m["bytes_in"]}'
+                )
+            family("phase_seconds_total", "counter", "Time spent per phase.")
+            for name, m in engines:
+                for phase, seconds in sorted(m["phases"].items()):
+                    labels = f'engine="{name}",phase="{phase}"'
+                    out.append(
+                        f"translator_phase_seconds_total{{{labels}}} {seconds:.6f}"
+                    )
+            family("duration_seconds", "histogram", "Translate call latency.")
+            for name, m in engines:
+                for bound, n in zip(self.BUCKETS, m["buckets"]):
+                    labels = f'engine="{name}",le="{bound}"'
+                    out.append(f"translator_duration_seconds_bucket{{{labels}}} {n}")
+                labels = f'engine="{name}",le="+Inf"'
+                out.append(
+                    f"translator_duration_seconds_bucket{{{labels}}} {m['calls']}"
+                )
+                out.append(
+                    f'translator_duration_seconds_sum{{engine="{name}"}} {m["sum"]:.6f}'
+                )
+                out.append(
+                    f'translator_duration_seconds_count{{engine="{name}"}} {m["calls"]}'
+                )
+        return "\n".join(out) + "\n"
+
+    def summary(self) -> str:
+        lines = []
+        with self._lock:
+            for name, m in sorted(self.engines.items()):
+                recent = sorted(m["recent"])
+
+                def pct(q: float) -> float:
+                    if not recent:
+                        return 0.0
+                    return recent[min(len(recent) - 1, int(q * len(recent)))] * 1000
+
+                lines.append(
+                    f"{name}: {m['calls']} calls, {m['errors']} errors, "
+                    f"{m['requests']} requests, {m['retries']} retries, "
+                    f"{m['bytes_out']} B out, {m['bytes_in']} B in, "
+                    f"p50 {pct(0.5):.1f} ms, p95 {pct(0.95):.1f} ms, "
+                    f"p99 {pct(0.99):.1f} ms"
+                )
+                calls = max(1, m["calls"])
+                phases = sorted(m["phases"].items(), key=lambda x: -x[1])
+                lines.append(
+                    "  avg "
+                    + ", ".join(f"{k} {v * 1000 / calls:.2f} ms" for k, v in phases)
+                )
+        return "\n".join(lines)
+
+
+# --trace=file: 每条记录写一行 JSON, 阶段耗时单位为毫秒
+class TraceWriter:
+    def __init__(self, path: str) -> None:
+        self._lock = threading.Lock()
+        self._fh = open(os.path.expanduser(path), "a", encoding="utf-8")
+
+    def __call__(self, record: Dict[str, Any]) -> None:
+        out = dict(record)
+        out["phases"] = {k: round(v * 1000, 3) for k, v in record["phases"].items()}
+        line = json.dumps(out, ensure_ascii=False) + "\n"
+        with self._lock:
+            self._fh.write(line)
+            self._fh.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._fh.close()
+
+
 # ----------------------------------------------------------------------
 # BasicTranslator
 # ----------------------------------------------------------------------
 class BasicTranslator:
+    # translate_many 单次请求最多携带的片段数/字符数, 可用 batch_size/batch_chars 配置
+    batch_size: int = 1
+    batch_chars: int = 0
+    # 单次请求的文本长度上限, 超过时分段翻译, 可用 max_chars 配置, 0 表示不限
+    max_chars: int = 0
+    # 支持的语言 (不含地区的代码), None 表示不限; 必须配置的键
+    languages: Optional[frozenset] = None
+    requires: Tuple[str, ...] = ()
+    # 只能查单词的词典引擎, --engine=auto 不会把句子交给它
+    words_only: bool = False
+    # 每个请求都带的固定请求头, 随 User-Agent/timeout/proxy 在首次请求时准备一次
+    static_headers: Dict[str, str] = {}
+
     def __init__(self, name: str, **argv: Any) -> None:
         self._name = name
         self._config: Dict[str, Any] = {}
+        self._sections: Dict[str, Dict[str, str]] = {}
         self._options = argv
-        self._session: Any = None
+        self.fields = parse_fields(argv.get("fields"))
         self._agent: Optional[str] = None
+        self._prepared: Dict[str, Dict[str, Any]] = {}
         self._load_config(name)
         self._check_proxy()
 
-    def __load_toml(
-        self, config_path: Optional[str | Path]
-    ) -> Optional[Dict[str, Dict[str, str]]]:
-        if not config_path:
-            return None
-        try:
-            path = Path(config_path).expanduser()
-        except TypeError:
-            return None
-        if not path.exists():
-            return None
-        try:
-            with path.open("rb") as fh:
-                raw = tomllib.load(fh)
-        except OSError:
-            return None
-
-        config: Dict[str, Dict[str, str]] = {}
-        for sect, values in raw.items():
-            if not isinstance(values, dict):
-                continue
-            section = config.setdefault(str(sect).lower(), {})
-            for key, val in values.items():
-                section[str(key).lower()] = "" if val is None else str(val)
-        config.setdefault("default", {})
-        return config
-
     def _load_config(self, name: str) -> bool:
         self._config = {}
-        config_path = Path("~/.config/translator/config.toml").expanduser()
-        config = self.__load_toml(config_path)
+        self._sections = {}
+        config = load_config()
         if not config:
             return False
+        self._sections = config
         for section in ("default", name):
             for key, value in config.get(section, {}).items():
                 self._config[key] = value
@@ -146,26 +492,40 @@ class BasicTranslator:
             self._config["proxy"] = proxy.strip()
         return True
 
-    def request(self, url, data=None, json=None, post=False, header=None):
-        import requests  # type: ignore [import-untyped]
-
-        if not self._session:
-            self._session = requests.Session()
+    # 请求的固定参数 (请求头, 超时, 代理), 每个实例每种客户端只构造一次;
+    # 调用方不能修改返回的字典
+    def prepared(self, aio: bool = False) -> Dict[str, Any]:
+        kind = "aio" if aio else "sync"
+        kargv = self._prepared.get(kind)
+        if kargv is not None:
+            return kargv
         kargv = {}
-        if header is not None:
-            header = copy.deepcopy(header)
-        else:
-            header = {}
+        header = dict(self.static_headers)
         if self._agent:
             header["User-Agent"] = self._agent
         kargv["headers"] = header
         timeout = self._config.get("timeout", 7)
         proxy = self._config.get("proxy", None)
         if timeout:
-            kargv["timeout"] = float(timeout)
+            if aio:
+                from aiohttp import ClientTimeout
+
+                kargv["timeout"] = ClientTimeout(total=float(timeout))
+            else:
+                kargv["timeout"] = float(timeout)
         if proxy:
-            proxies = {"http": proxy, "https": proxy}
-            kargv["proxies"] = proxies
+            if aio:
+                kargv["proxy"] = proxy
+            else:
+                kargv["proxies"] = {"http": proxy, "https": proxy}
+        self._prepared[kind] = kargv
+        return kargv
+
+    # 每次调用只合并本次请求特有的部分
+    def _request_kwargs(self, aio, data, json, post, header) -> Dict[str, Any]:
+        kargv = dict(self.prepared(aio))
+        if header:
+            kargv["headers"] = {**kargv["headers"], **header}
         if not post:
             if data is not None:
                 kargv["params"] = data
@@ -174,18 +534,179 @@ class BasicTranslator:
                 kargv["data"] = data
             if json is not None:
                 kargv["json"] = json
-        if not post:
-            r = self._session.get(url, **kargv)
-        else:
-            r = self._session.post(url, **kargv)
-        return r
+        return kargv
+
+    # stream=True 时响应体留给 parse 用 iter_content 逐块读取
+    def request(
+        self, url, data=None, json=None, post=False, header=None, chars=0, stream=False
+    ):
+        import requests  # type: ignore [import-untyped]
+
+        session = HttpPool.session(url, self._config)
+        kargv = self._request_kwargs(False, data, json, post, header)
+        if stream:
+            kargv["stream"] = True
+        breaker = self.get_breaker()
+        limiter = self.get_limiter()
+        record = _TRACE.get()
+        size = 0 if record is None else request_size(url, data, json)
+        attempt = 0
+        while True:
+            breaker.check()
+            if limiter is not None:
+                wait = limiter.reserve(chars)
+                time.sleep(wait)
+                if record is not None:
+                    add_phase(record, "ratelimit", wait)
+            started = time.perf_counter()
+            try:
+                if not post:
+                    r = session.get(url, **kargv)
+                else:
+                    r = session.post(url, **kargv)
+            except requests.RequestException:
+                record_request(record, started, size)
+                breaker.failure()
+                delay = self.retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                received = None
+                if stream:
+                    received = int(r.headers.get("Content-Length") or 0)
+                record_request(record, started, size, r, None, received)
+                if not self.retryable(r.status_code):
+                    breaker.success()
+                    return r
+                if stream:
+                    r.close()
+                breaker.failure()
+                delay = self.retry_delay(attempt, r.headers)
+                if delay is None:
+                    return r
+            attempt += 1
+            if record is not None:
+                record["retries"] += 1
+            time.sleep(delay)
+
+    # 429 和 5xx 视为暂时性错误, 可以重试
+    def retryable(self, status: int) -> bool:
+        return status == 429 or status >= 500
+
+    # 第 attempt 次失败后的等待秒数 (指数退避 + 抖动, 遵循 Retry-After),
+    # 返回 None 表示不再重试
+    def retry_delay(self, attempt: int, headers: Any = None) -> Optional[float]:
+        import random
+
+        if attempt >= int(self._config.get("retries", 2)):
+            return None
+        backoff = float(self._config.get("backoff", 0.5))
+        limit = float(self._config.get("backoff_max", 8))
+        delay = min(limit, backoff * (2**attempt))
+        delay = random.uniform(delay / 2, delay)
+        after = parse_retry_after((headers or {}).get("Retry-After"))
+        if after is not None:
+            if after > limit:
+                return None
+            delay = max(delay, after)
+        return delay
+
+    def get_breaker(self) -> "CircuitBreaker":
+        return CircuitBreaker.get(self._name, self._config)
+
+    # 配置了 qps/cps 时按引擎和 apikey 限速
+    def get_limiter(self) -> Optional["RateLimiter"]:
+        return RateLimiter.get(self._name, self._config)
+
+    # 失败或熔断时改用配置的 backup 引擎, 已经用过的引擎不会重复尝试
+    def get_backup(self) -> Optional["BasicTranslator"]:
+        name = self._config.get("backup")
+        chain = self._options.get("chain", ()) + (self._name,)
+        if not name or name not in ENGINES or name in chain:
+            return None
+        options = dict(self._options)
+        options["chain"] = chain
+        try:
+            return ENGINES[name](**options)
+        except SystemExit:
+            return None
 
     def http_get(self, url, data=None, headers=None):
-        return self.request(url, data, False, headers)
+        return self.request(url, data, None, False, headers)
 
     def http_post(self, url, /, data=None, json=None, headers=None):
         return self.request(url, data, json, True, headers)
 
+    # 异步版本: 共享 AsyncHttpPool 连接池, 返回 HttpResponse
+    # 异步响应总是整体读取, stream 只为和 request 的参数保持一致
+    async def arequest(
+        self, url, data=None, json=None, post=False, header=None, chars=0, stream=False
+    ):
+        session = AsyncHttpPool.session(self._config)
+        kargv = self._request_kwargs(True, data, json, post, header)
+        import asyncio
+
+        import aiohttp
+
+        method = session.post if post else session.get
+        fixtures = HttpPool.fixtures
+        if fixtures is not None:
+            key = fixtures.key("POST" if post else "GET", url, kargv)
+        breaker = self.get_breaker()
+        limiter = self.get_limiter()
+        record = _TRACE.get()
+        size = 0 if record is None else request_size(url, data, json)
+        attempt = 0
+        while True:
+            breaker.check()
+            if limiter is not None:
+                wait = limiter.reserve(chars)
+                await asyncio.sleep(wait)
+                if record is not None:
+                    add_phase(record, "ratelimit", wait)
+            started = time.perf_counter()
+            try:
+                if fixtures is not None and fixtures.mode == "replay":
+                    await asyncio.sleep(fixtures.delay())
+                    found = fixtures.load(key)
+                    if found is None:
+                        raise aiohttp.ClientConnectionError(f"no fixture for {url}")
+                    resp, server = found, None
+                else:
+                    async with method(url, **kargv) as r:
+                        server = time.perf_counter() - started
+                        content = await r.read()
+                        resp = HttpResponse(
+                            r.status, dict(r.headers), content, str(r.url)
+                        )
+                    if fixtures is not None:
+                        fixtures.save(key, "POST" if post else "GET", url, resp)
+                record_request(record, started, size, resp, server)
+            except (aiohttp.ClientError, asyncio.TimeoutError):
+                record_request(record, started, size)
+                breaker.failure()
+                delay = self.retry_delay(attempt)
+                if delay is None:
+                    raise
+            else:
+                if not self.retryable(resp.status_code):
+                    breaker.success()
+                    return resp
+                breaker.failure()
+                delay = self.retry_delay(attempt, resp.headers)
+                if delay is None:
+                    return resp
+            attempt += 1
+            if record is not None:
+                record["retries"] += 1
+            await asyncio.sleep(delay)
+
+    async def ahttp_get(self, url, data=None, headers=None):
+        return await self.arequest(url, data, None, False, headers)
+
+    async def ahttp_post(self, url, /, data=None, json=None, headers=None):
+        return await self.arequest(url, data, json, True, headers)
+
     def url_unquote(self, text: str, plus: bool = True) -> str:
         return unquote_plus(text) if plus else unquote(text)
 
@@ -206,77 +727,1581 @@ class BasicTranslator:
         res["tl"] = tl  # 目标语言
         res["text"] = text  # 需要翻译的文本
         res["phonetic"] = None  # 音标
-        res["definition"] = None  # 简单释义
+        res["definition"] = None  # 简单释义 / 整句译文
         res["explain"] = None  # 分行解释
+        res["detail"] = None  # 详细释义
+        res["alternative"] = None  # 候选译文
         return res
 
-    # 翻译结果：需要填充如下字段
-    def translate(self, sl: str, tl: str, text: str) -> Dict[str, Any]:
+    # 构造请求: 返回 request() 的参数, None 表示不需要网络请求
+    def prepare(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        return None
+
+    # 解析响应: 同步/异步请求共用
+    def parse(self, sl: str, tl: str, text: str, resp: Any) -> Optional[Dict[str, Any]]:
         return self.create_translation(sl, tl, text)
 
-    # 是否是英文
-    def check_english(self, text: str) -> bool:
-        for ch in text:
-            if ord(ch) >= 128:
-                return False
-        return True
+    # 翻译结果：需要填充如下字段
+    def translate(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        sl, tl = self.guess_language(sl, tl, text)
+        with Instrument(self._name, "translate", sl, tl, len(text)):
+            with TracePhase("prepare"):
+                req = self.prepare(sl, tl, text)
+            if req is None:
+                return self.parse(sl, tl, text, None)
+            req.setdefault("chars", len(text))
+            resp = self.request(**req)
+            with TracePhase("parse"):
+                return self.select_fields(self.parse(sl, tl, text, resp))
+
+    async def atranslate(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        sl, tl = self.guess_language(sl, tl, text)
+        with Instrument(self._name, "translate", sl, tl, len(text)):
+            with TracePhase("prepare"):
+                req = self.prepare(sl, tl, text)
+            if req is None:
+                return self.parse(sl, tl, text, None)
+            req.setdefault("chars", len(text))
+            resp = await self.arequest(**req)
+            with TracePhase("parse"):
+                return self.select_fields(self.parse(sl, tl, text, resp))
+
+    # 缓存键中的引擎名, 请求内容随选项变化的引擎会附加选项
+    def cache_name(self) -> str:
+        if self.fields is None:
+            return self._name
+        return "{}:fields={}".format(self._name, ",".join(sorted(self.fields)))
+
+    # 调用方是否需要某个结果字段
+    def wants(self, field: str) -> bool:
+        return self.fields is None or field in self.fields
+
+    # 整理为统一格式: 基本字段加调用方需要的字段, 兼容缓存中的旧格式
+    def select_fields(self, res: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+        if not res:
+            return res
+        out = {k: res.get(k) for k in BASE_FIELDS}
+        if out["engine"] is None:
+            out["engine"] = self._name
+        for key in FIELDS:
+            if self.wants(key):
+                out[key] = res.get(key)
+        if out.get("definition") is None and res.get("translation") is not None:
+            if self.wants("definition"):
+                out["definition"] = res["translation"]
+        if "memory" in res:
+            out["memory"] = res["memory"]
+        return out
+
+    # 翻译记忆: 选项 memory=True 或配置 [memory] enabled = true 时启用
+    def get_memory(self) -> Optional["TranslationMemory"]:
+        config = self._sections.get("memory", {})
+        if not self._options.get("memory", config_bool(config.get("enabled"))):
+            return None
+        return TranslationMemory.open(config)
 
-    # 猜测语言
+    # 依次查询缓存和翻译记忆, 未命中返回 None
+    def recall(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        if self._options.get("refresh"):
+            return None
+        cache = self.get_cache()
+        if cache is not None:
+            res = cache.get(self.cache_name(), sl, tl, text)
+            if res is not None:
+                return self.select_fields(res)
+        memory = self.get_memory()
+        if memory is not None:
+            return self.select_fields(memory.match(self.cache_name(), sl, tl, text))
+        return None
+
+    def remember(self, sl: str, tl: str, text: str, res: Dict[str, Any]) -> None:
+        cache = self.get_cache()
+        if cache is not None:
+            cache.put(self.cache_name(), sl, tl, text, res)
+        memory = self.get_memory()
+        if memory is not None:
+            memory.add(self.cache_name(), sl, tl, text, res)
+
+    # 缓存: 选项 cache=False 关闭, refresh=True 跳过读取但仍写入
+    def get_cache(self) -> Optional["TranslationCache"]:
+        if not self._options.get("cache", True):
+            return None
+        return TranslationCache.open(self._sections.get("cache", {}))
+
+    # 带缓存的翻译入口, 缓存键使用 guess_language 归一化后的 sl/tl
+    def lookup(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        sl, tl = self.guess_language(sl, tl, text)
+        chunks = self.split_text(text)
+        if len(chunks) > 1:
+            from concurrent.futures import ThreadPoolExecutor
+
+            workers = int(self._config.get("chunk_workers") or 4)
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                parts = list(
+                    executor.map(lambda c: self._lookup_chunk(sl, tl, c[0]), chunks)
+                )
+            return self.join_chunks(sl, tl, text, chunks, parts)
+        res = self.recall(sl, tl, text)
+        if res is not None:
+            return res
+        key = (self.cache_name(), sl, tl, text)
+        return IN_FLIGHT.do(key, lambda: self._lookup_fresh(sl, tl, text))
+
+    def _lookup_fresh(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        try:
+            res = self.translate(sl, tl, text)
+        except Exception:
+            backup = self.get_backup()
+            if backup is None:
+                raise
+            return backup.lookup(sl, tl, text)
+        if not res:
+            backup = self.get_backup()
+            return backup.lookup(sl, tl, text) if backup is not None else res
+        self.remember(sl, tl, text, res)
+        return res
+
+    async def alookup(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        import asyncio
+
+        sl, tl = self.guess_language(sl, tl, text)
+        chunks = self.split_text(text)
+        if len(chunks) > 1:
+            parts = await asyncio.gather(
+                *(self.alookup(sl, tl, c) for c, _ in chunks if c.strip())
+            )
+            found = iter(parts)
+            parts = [next(found) if c.strip() else None for c, _ in chunks]
+            return self.join_chunks(sl, tl, text, chunks, parts)
+        res = self.recall(sl, tl, text)
+        if res is not None:
+            return res
+        key = (self.cache_name(), sl, tl, text)
+        return await IN_FLIGHT.ado(key, lambda: self._alookup_fresh(sl, tl, text))
+
+    async def _alookup_fresh(
+        self, sl: str, tl: str, text: str
+    ) -> Optional[Dict[str, Any]]:
+        try:
+            res = await self.atranslate(sl, tl, text)
+        except Exception:
+            backup = self.get_backup()
+            if backup is None:
+                raise
+            return await backup.alookup(sl, tl, text)
+        if not res:
+            backup = self.get_backup()
+            return await backup.alookup(sl, tl, text) if backup is not None else res
+        self.remember(sl, tl, text, res)
+        return res
+
+    # 按段落/句子/子句/空白切分, 返回 [(片段, 与下一片段之间的分隔符)]
+    def split_text(self, text: str, limit: int = 0) -> List[Tuple[str, str]]:
+        limit = limit or int(self._config.get("max_chars") or self.max_chars)
+        if not limit or len(text) <= limit:
+            return [(text, "")]
+        return _split_text(text, limit, 0)
+
+    def _lookup_chunk(self, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        return self.lookup(sl, tl, text) if text.strip() else None
+
+    # 拼接分段翻译结果: 字符串字段按原分隔符连接, 列表字段依次合并
+    def join_chunks(
+        self,
+        sl: str,
+        tl: str,
+        text: str,
+        chunks: List[Tuple[str, str]],
+        parts: List[Optional[Dict[str, Any]]],
+    ) -> Optional[Dict[str, Any]]:
+        # 空白片段不翻译, 原样保留
+        found = [p for p, (c, _) in zip(parts, chunks) if c.strip()]
+        if not found or not all(found):
+            return None
+        res: Dict[str, Any] = dict(found[0] or {})
+        res["text"] = text
+        res["sl"], res["tl"] = sl, tl
+        if "phonetic" in res:
+            res["phonetic"] = None
+        for key, value in res.items():
+            if key in BASE_FIELDS or key == "phonetic":
+                continue
+            if isinstance(value, str):
+                res[key] = "".join(
+                    (str(part.get(key) or "").rstrip("\n") if part else chunk) + sep
+                    for part, (chunk, sep) in zip(parts, chunks)
+                )
+            elif isinstance(value, list) or value is None:
+                merged: List[Any] = []
+                for part in parts:
+                    merged.extend((part or {}).get(key) or [])
+                res[key] = merged or value
+        return res
+
+    # 批量翻译: 结果与 texts 一一对应, 支持数组的引擎会覆盖此方法合并请求
+    def translate_many(
+        self, sl: str, tl: str, texts: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        return [self.translate(sl, tl, text) for text in texts]
+
+    # 带缓存的批量入口, 按 guess_language 的结果分组后调用 translate_many
+    def lookup_many(
+        self, sl: str, tl: str, texts: List[str]
+    ) -> List[Optional[Dict[str, Any]]]:
+        results: List[Optional[Dict[str, Any]]] = [None] * len(texts)
+        groups: Dict[Tuple[str, str], List[int]] = {}
+        # 重复文本只请求一次; 其他线程已在请求的文本等待其结果
+        owned: Dict[Tuple[str, str, str, str], Any] = {}
+        waiting: Dict[Tuple[str, str, str, str], Any] = {}
+        indexes_of: Dict[Tuple[str, str, str, str], List[int]] = {}
+        # 超过 max_chars 的文本走 lookup 分段翻译, 不放进整批请求
+        long: List[int] = []
+        for index, text in enumerate(texts):
+            if len(self.split_text(text)) > 1:
+                long.append(index)
+                continue
+            xsl, xtl = self.guess_language(sl, tl, text)
+            results[index] = self.recall(xsl, xtl, text)
+            if results[index] is not None:
+                continue
+            key = (self.cache_name(), xsl, xtl, text)
+            if key not in indexes_of:
+                call, leader = IN_FLIGHT.claim(key)
+                if leader:
+                    owned[key] = call
+                    groups.setdefault((xsl, xtl), []).append(index)
+                else:
+                    waiting[key] = call
+            indexes_of.setdefault(key, []).append(index)
+        # 合并请求的引擎整组记为一条 translate_many, 否则每条各自记录
+        batched = type(self).translate_many is not BasicTranslator.translate_many
+        try:
+            for (xsl, xtl), indexes in groups.items():
+                chunk = [texts[i] for i in indexes]
+                if batched:
+                    chars = sum(len(x) for x in chunk)
+                    with Instrument(self._name, "translate_many", xsl, xtl, chars):
+                        fresh = self.translate_many(xsl, xtl, chunk)
+                else:
+                    fresh = self.translate_many(xsl, xtl, chunk)
+                for index, res in zip(indexes, fresh):
+                    res = self.select_fields(res)
+                    key = (self.cache_name(), xsl, xtl, texts[index])
+                    for i in indexes_of[key]:
+                        results[i] = res
+                    if res:
+                        self.remember(xsl, xtl, texts[index], res)
+                    IN_FLIGHT.finish(key, owned.pop(key), res)
+        except BaseException as e:
+            for key, call in owned.items():
+                IN_FLIGHT.finish(key, call, error=e)
+            raise
+        for key, call in owned.items():
+            IN_FLIGHT.finish(key, call, None)
+        for key, call in waiting.items():
+            res = IN_FLIGHT.wait(call)
+            for i in indexes_of[key]:
+                results[i] = res
+        for index in long:
+            results[index] = self.lookup(sl, tl, texts[index])
+        return results
+
+    # 翻译到多个目标语言, 返回 {目标语言: 结果}; 默认并发调用 translate,
+    # 一次请求支持多个目标语言的引擎覆盖此方法
+    def translate_targets(
+        self, sl: str, targets: List[str], text: str
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        from concurrent.futures import ThreadPoolExecutor
+
+        workers = max(1, min(len(targets), int(self._config.get("workers") or 8)))
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            found = executor.map(lambda tl: self.translate(sl, tl, text), targets)
+            return dict(zip(targets, found))
+
+    # 带缓存的多目标入口: 共用一个实例 (连接池), 没有原生多目标接口的引擎
+    # 并发调用 lookup, 结果按目标语言返回
+    def lookup_targets(
+        self, sl: str, targets: List[str], text: str
+    ) -> Dict[str, Optional[Dict[str, Any]]]:
+        from concurrent.futures import ThreadPoolExecutor
+
+        targets = list(dict.fromkeys(targets))
+        results: Dict[str, Optional[Dict[str, Any]]] = {}
+        native = type(self).translate_targets is not BasicTranslator.translate_targets
+        misses = targets
+        if native and len(self.split_text(text)) == 1:
+            misses = []
+            for tl in targets:
+                results[tl] = self.recall(*self.guess_language(sl, tl, text), text)
+                if results[tl] is None:
+                    misses.append(tl)
+            if misses:
+                try:
+                    with Instrument(self._name, "translate_targets", sl, "", len(text)):
+                        fresh = self.translate_targets(sl, misses, text)
+                except Exception as e:
+                    # 合并请求失败时逐个目标重试
+                    sys.stderr.write(f"{RED}{self._name}: {e}{RESET}\n")
+                    fresh = {}
+                for tl in misses:
+                    res = self.select_fields(fresh.get(tl))
+                    if res:
+                        results[tl] = res
+                        self.remember(*self.guess_language(sl, tl, text), text, res)
+                misses = [tl for tl in misses if not results.get(tl)]
+        if misses:
+            workers = max(1, min(len(misses), int(self._config.get("workers") or 8)))
+
+            # 单个目标失败记为 None, 不影响其他目标
+            def work(tl: str) -> Optional[Dict[str, Any]]:
+                try:
+                    return self.lookup(sl, tl, text)
+                except Exception as e:
+                    sys.stderr.write(f"{RED}{self._name} ({tl}): {e}{RESET}\n")
+                    return None
+
+            with ThreadPoolExecutor(max_workers=workers) as executor:
+                results.update(zip(misses, executor.map(work, misses)))
+        return {tl: results.get(tl) for tl in targets}
+
+    # 按条数和长度限制把片段分组, 返回每组的下标
+    def pack_segments(self, texts: List[str], measure=len) -> List[List[int]]:
+        max_count = int(self._config.get("batch_size") or self.batch_size)
+        max_chars = int(self._config.get("batch_chars") or self.batch_chars)
+        groups: List[List[int]] = []
+        current: List[int] = []
+        size = 0
+        for index, text in enumerate(texts):
+            n = measure(text)
+            full = max_count and len(current) >= max_count
+            if current and (full or (max_chars and size + n > max_chars)):
+                groups.append(current)
+                current, size = [], 0
+            current.append(index)
+            size += n
+        if current:
+            groups.append(current)
+        return groups
+
+    # 猜测语言: 源语言由本地检测决定, 中文译为英文, 其他语言译为中文
     def guess_language(self, sl: str, tl: str, text: str) -> Tuple[str, str]:
         if ((not sl) or sl == "auto") and ((not tl) or tl == "auto"):
-            if self.check_english(text):
-                sl, tl = ("en-US", "zh-CN")
-            else:
-                sl, tl = ("zh-CN", "en-US")
+            sl = detect_language(text)
+            tl = "en-US" if sl.startswith("zh") else "zh-CN"
+            if sl == "auto":
+                return sl, tl
         if sl.lower() in langmap:
             sl = langmap[sl.lower()]
         if tl.lower() in langmap:
             tl = langmap[tl.lower()]
         return sl, tl
 
-    def md5sum(self, text: str | bytes) -> str:
-        data = text.encode("utf-8") if isinstance(text, str) else text
-        return hashlib.md5(data).hexdigest()
+
+# ----------------------------------------------------------------------
+# 离线语言检测: 先按 Unicode 文字区间判断, 拉丁字母再用三字母组频率表
+# 区分常见欧洲语言; 只检查前 sample 个字符
+# ----------------------------------------------------------------------
+_SCRIPT_RANGES = [
+    (0x3040, 0x30FF, "ja"),
+    (0x31F0, 0x31FF, "ja"),
+    (0x1100, 0x11FF, "ko"),
+    (0x3130, 0x318F, "ko"),
+    (0xAC00, 0xD7AF, "ko"),
+    (0x3400, 0x4DBF, "zh"),
+    (0x4E00, 0x9FFF, "zh"),
+    (0xF900, 0xFAFF, "zh"),
+    (0x0400, 0x04FF, "ru"),
+    (0x0370, 0x03FF, "el"),
+    (0x0590, 0x05FF, "he"),
+    (0x0600, 0x06FF, "ar"),
+    (0x0900, 0x097F, "hi"),
+    (0x0E00, 0x0E7F, "th"),
+]
+
+# 每种语言最常见的三字母组, "_" 表示词边界
+_TRIGRAM_PROFILES = {
+    "en": "_th the he_ _an and nd_ ing ng_ _to _of of_ _in ion tio on_ ed_ "
+    "er_ _a_ _is is_ re_ es_ at_ ent _be _ha hat tha _wh ere _fo for or_ "
+    "_it ter ly_ _wi ith wit al_ ons _yo you ou_ _we _no all his",
+    "fr": "_de es_ de_ le_ _le ent nt_ _la la_ _et et_ les ion re_ on_ "
+    "_pa _qu que ue_ _un ne_ _co _ce eme men _po ous _pr our ait _du du_ "
+    "_en ans _da dan ur_ ai_ _à_ té_ ée_ _es est st_ _vo vou _je _ét é è ê à ç œ ù",
+    "de": "en_ er_ _de der ch_ ie_ ich ein _di die _un und nd_ sch che _ei "
+    "in_ te_ den gen _da ung ng_ cht ten _ge _zu _ve ver _be ine _ni nic "
+    "ht_ ist _is st_ _au auf es_ _mi mit it_ _si sie eit _ha ä ö ü ß",
+    "es": "_de de_ os_ _la la_ es_ _qu que ue_ _el el_ ent as_ _en en_ _co "
+    "ón_ ión aci cio _lo los _se _pa _un _po ado do_ ra_ ar_ nte est _es "
+    "con _ca par _y_ por or_ ida dad del _ta _ha _mu muy ñ á í ó ú ¿ ¡",
+    "it": "_di di_ _ch che he_ _il il_ _la la_ re_ to_ _de ell lla _co _pe "
+    "per er_ ent ion zio ne_ _e_ _in one _un no_ _no non _so ato _ne _al "
+    "del _si ta_ _st ere _è_ gli _gl _ma _qu lle ti_ è ò ì à ù",
+    "pt": "_de de_ _qu que ue_ os_ _do do_ _da da_ ão_ ção açã _co _a_ _o_ "
+    "_e_ es_ ent _em em_ _pa _se _um um_ ra_ as_ _no nto _na com _pr par "
+    "_po men _nã não _ma _é_ ões ã õ ç á é ê ó",
+    "nl": "en_ _de de_ an_ _he het et_ _va van _ee een _en _in ij_ er_ _ge "
+    "aar oor _di die ing ng_ cht _ve _me _zi _da dat at_ _ni nie iet _te "
+    "te_ _wa _vo voo ijk lij _ij _zi zij _ma _oo ook",
+}
+
+
+@functools.cache
+def _trigram_table() -> Dict[str, List[Tuple[str, float]]]:
+    table: Dict[str, List[Tuple[str, float]]] = {}
+    for lang, profile in _TRIGRAM_PROFILES.items():
+        grams = profile.split()
+        for rank, gram in enumerate(grams):
+            # 排名越靠前权重越高, 单个字符是该语言独有的字母, 权重更高
+            weight = 3.0 if len(gram) == 1 else 1.0 + (len(grams) - rank) / len(grams)
+            table.setdefault(gram, []).append((lang, weight))
+    return table
+
+
+def detect_language(text: str, sample: int = 256) -> str:
+    text = text[:sample]
+    counts: Dict[str, int] = {}
+    latin = 0
+    for ch in text:
+        code = ord(ch)
+        if code < 128:
+            if ch.isalpha():
+                latin += 1
+            continue
+        if ch.isalpha() and code < 0x0250:
+            latin += 1
+            continue
+        for low, high, lang in _SCRIPT_RANGES:
+            if low <= code <= high:
+                counts[lang] = counts.get(lang, 0) + 1
+                break
+    if counts:
+        # 日文常混有汉字, 出现假名时汉字也计入日文
+        if counts.get("ja"):
+            counts["ja"] += counts.pop("zh", 0)
+        lang = max(counts, key=lambda k: counts[k])
+        # 夹杂少量其他文字的西文仍按拉丁字母判断
+        if counts[lang] * 2 >= latin or counts[lang] >= 8:
+            return "zh-CN" if lang == "zh" else lang
+    if not latin:
+        return "en-US"
+    words = re.findall(r"[^\W\d_]+", text.lower())
+    # 很短的纯 ASCII 文本基本是英文单词或界面文字, 三字母组的证据不够
+    if text.isascii() and len(words) < 4:
+        return "en-US"
+    table = _trigram_table()
+    scores: Dict[str, float] = {}
+    for word in words:
+        word = "_" + word + "_"
+        for i in range(len(word) - 2):
+            for lang, weight in table.get(word[i : i + 3], ()):
+                scores[lang] = scores.get(lang, 0.0) + weight
+        for ch in word:
+            if ord(ch) >= 128:
+                for lang, weight in table.get(ch, ()):
+                    scores[lang] = scores.get(lang, 0.0) + weight
+    best = max(scores, key=lambda k: scores[k], default="en")
+    if best == "en":
+        return "en-US"
+    # 要明显领先英文和第二名才采用, 否则返回 auto 交给服务端识别
+    second = max((v for k, v in scores.items() if k != best), default=0.0)
+    if scores[best] >= 2 * scores.get("en", 0.0) + 1 and scores[best] >= 1.3 * second:
+        return best
+    return "auto"
+
+
+# ----------------------------------------------------------------------
+# 长文本切分: 依次尝试段落, 换行, 句末标点, 子句标点, 空白, 最后硬切
+# ----------------------------------------------------------------------
+_SPLIT_LEVELS = [
+    re.compile(r"(\n[ \t]*\n\s*)"),
+    re.compile(r"(\n)"),
+    re.compile(r"(?<=[.!?;。！？；…])(\s*)"),
+    re.compile(r"(?<=[,，、:：])(\s*)"),
+    re.compile(r"(\s+)"),
+]
+
+
+def _split_text(text: str, limit: int, level: int) -> List[Tuple[str, str]]:
+    if len(text) <= limit:
+        return [(text, "")]
+    if level >= len(_SPLIT_LEVELS):
+        return [(text[i : i + limit], "") for i in range(0, len(text), limit)]
+    pieces = _SPLIT_LEVELS[level].split(text)
+    if len(pieces) < 3:
+        return _split_text(text, limit, level + 1)
+    pieces.append("")
+    atoms: List[Tuple[str, str]] = []
+    for content, sep in zip(pieces[0::2], pieces[1::2]):
+        if len(content) > limit:
+            sub = _split_text(content, limit, level + 1)
+            atoms.extend(sub[:-1])
+            atoms.append((sub[-1][0], sub[-1][1] + sep))
+        else:
+            atoms.append((content, sep))
+    chunks: List[Tuple[str, str]] = []
+    current, pending = atoms[0]
+    for content, sep in atoms[1:]:
+        if len(current) + len(pending) + len(content) <= limit:
+            current += pending + content
+        else:
+            chunks.append((current, pending))
+            current = content
+        pending = sep
+    chunks.append((current, pending))
+    return chunks
+
+
+# ----------------------------------------------------------------------
+# 翻译缓存: sqlite 持久化, 按 TTL 过期, 超过 max_entries 时淘汰最久未用
+# ----------------------------------------------------------------------
+def config_bool(value: Any, default: bool = False) -> bool:
+    if value is None or value == "":
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "on")
+
+
+class TranslationCache:
+    """Persistent result cache keyed by (engine, sl, tl, text).
+
+    config (``[cache]`` section of config.toml):
+        enabled = true
+        path = "~/.cache/translator/cache.db"
+        ttl = 2592000          # seconds, 0 means never expire
+        max_entries = 100000   # 0 means unlimited
+    """
+
+    _instances: Dict[str, "TranslationCache"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(self, path: str | Path, ttl: float = 0, max_entries: int = 0):
+        import sqlite3
+
+        self.path = Path(path).expanduser()
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS cache ("
+            "engine TEXT, sl TEXT, tl TEXT, text TEXT, value TEXT, "
+            "mtime REAL, atime REAL, PRIMARY KEY (engine, sl, tl, text))"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS cache_atime ON cache (atime)")
+        self._db.commit()
+        self.evict()
+
+    @classmethod
+    def open(cls, config: Dict[str, str]) -> Optional["TranslationCache"]:
+        if not config_bool(config.get("enabled"), True):
+            return None
+        path = config.get("path") or "~/.cache/translator/cache.db"
+        with cls._instances_lock:
+            cache = cls._instances.get(path)
+            if cache is None:
+                try:
+                    cache = cls(
+                        path,
+                        ttl=float(config.get("ttl") or 30 * 86400),
+                        max_entries=int(config.get("max_entries") or 100000),
+                    )
+                except Exception as e:
+                    sys.stderr.write(f"{RED}cache disabled: {e}{RESET}\n")
+                    return None
+                cls._instances[path] = cache
+        return cache
+
+    def get(self, engine: str, sl: str, tl: str, text: str) -> Optional[Dict[str, Any]]:
+        key = (engine, sl, tl, text)
+        now = time.time()
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT value, mtime FROM cache "
+                    "WHERE engine=? AND sl=? AND tl=? AND text=?",
+                    key,
+                ).fetchone()
+                if row is None:
+                    return None
+                if self.ttl and now - row[1] > self.ttl:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE engine=? AND sl=? AND tl=? AND text=?",
+                        key,
+                    )
+                    self._db.commit()
+                    return None
+                self._db.execute(
+                    "UPDATE cache SET atime=? "
+                    "WHERE engine=? AND sl=? AND tl=? AND text=?",
+                    (now,) + key,
+                )
+                self._db.commit()
+            except Exception:
+                return None
+        return json.loads(row[0])
+
+    def put(
+        self, engine: str, sl: str, tl: str, text: str, value: Dict[str, Any]
+    ) -> bool:
+        now = time.time()
+        with self._lock:
+            try:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (engine, sl, tl, text, json.dumps(value), now, now),
+                )
+                self._db.commit()
+            except Exception:
+                return False
+            self._writes += 1
+        if self._writes % 64 == 0:
+            self.evict()
+        return True
+
+    # 删除过期条目, 并只保留最近使用的 max_entries 条
+    def evict(self) -> None:
+        with self._lock:
+            try:
+                if self.ttl:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE mtime < ?", (time.time() - self.ttl,)
+                    )
+                if self.max_entries:
+                    self._db.execute(
+                        "DELETE FROM cache WHERE rowid IN (SELECT rowid FROM cache "
+                        "ORDER BY atime DESC LIMIT -1 OFFSET ?)",
+                        (self.max_entries,),
+                    )
+                self._db.commit()
+            except Exception:
+                pass
+
+    def clear(self) -> None:
+        with self._lock:
+            self._db.execute("DELETE FROM cache")
+            self._db.commit()
+
+
+# ----------------------------------------------------------------------
+# 翻译记忆: 归一化文本并遮蔽数字/占位符/URL, 按字符 n-gram 的 Jaccard
+# 相似度复用相近片段的译文, 再把当前文本的数字等填回译文
+# ----------------------------------------------------------------------
+class TranslationMemory:
+    """Fuzzy translation memory for near-duplicate segments.
+
+    config (``[memory]`` section of config.toml):
+        enabled = false
+        path = "~/.cache/translator/memory.db"
+        threshold = 0.9     # minimum n-gram similarity to reuse a translation
+        ngram = 3
+        max_length = 500    # longer segments are not memorized
+    """
+
+    MASK = re.compile(
+        r"(?P<url>https?://\S+)"
+        r"|(?P<placeholder>\{[^{}\s]*\}|\$\{\w+\}|%\(\w+\)[sdif]|%[sdif])"
+        r"|(?P<number>\d+(?:[.,:]\d+)*)"
+    )
+
+    _instances: Dict[str, "TranslationMemory"] = {}
+    _instances_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: str | Path,
+        threshold: float = 0.9,
+        ngram: int = 3,
+        max_length: int = 500,
+    ) -> None:
+        import sqlite3
+
+        self.path = Path(path).expanduser()
+        self.threshold = threshold
+        self.ngram = ngram
+        self.max_length = max_length
+        self._lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA synchronous=NORMAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS segments ("
+            "id INTEGER PRIMARY KEY, engine TEXT, sl TEXT, tl TEXT, norm TEXT, "
+            "kinds TEXT, size INTEGER, value TEXT, mtime REAL, "
+            "UNIQUE (engine, sl, tl, norm))"
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS grams (gram TEXT, seg INTEGER)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS grams_gram ON grams (gram)")
+        self._db.execute("CREATE INDEX IF NOT EXISTS grams_seg ON grams (seg)")
+        self._db.commit()
+
+    @classmethod
+    def open(cls, config: Dict[str, str]) -> Optional["TranslationMemory"]:
+        path = config.get("path") or "~/.cache/translator/memory.db"
+        with cls._instances_lock:
+            memory = cls._instances.get(path)
+            if memory is None:
+                try:
+                    memory = cls(
+                        path,
+                        threshold=float(config.get("threshold") or 0.9),
+                        ngram=int(config.get("ngram") or 3),
+                        max_length=int(config.get("max_length") or 500),
+                    )
+                except Exception as e:
+                    sys.stderr.write(f"{RED}memory disabled: {e}{RESET}\n")
+                    return None
+                cls._instances[path] = memory
+        return memory
+
+    # 返回 (归一化文本, 被遮蔽的值, 值的类型)
+    def mask(self, text: str) -> Tuple[str, List[str], List[str]]:
+        values: List[str] = []
+        kinds: List[str] = []
+
+        def repl(m: "re.Match[str]") -> str:
+            values.append(m.group(0))
+            kinds.append(m.lastgroup or "")
+            return "\u27e6{}\u27e7".format((m.lastgroup or "?")[0])
+
+        norm = " ".join(self.MASK.sub(repl, text).split()).lower()
+        return norm, values, kinds
+
+    def grams(self, norm: str) -> set:
+        padded = " " + norm + " "
+        n = self.ngram
+        return {padded[i : i + n] for i in range(max(1, len(padded) - n + 1))}
+
+    def match(
+        self, engine: str, sl: str, tl: str, text: str
+    ) -> Optional[Dict[str, Any]]:
+        if len(text) > self.max_length:
+            return None
+        norm, values, kinds = self.mask(text)
+        grams = self.grams(norm)
+        key = (engine, sl, tl, ",".join(kinds))
+        with self._lock:
+            try:
+                row = self._db.execute(
+                    "SELECT value FROM segments WHERE engine=? AND sl=? AND tl=? "
+                    "AND kinds=? AND norm=?",
+                    key + (norm,),
+                ).fetchone()
+                score = 1.0
+                if row is None and self.threshold < 1:
+                    row, score = self._nearest(key, grams)
+            except Exception:
+                return None
+        if row is None:
+            return None
+        res = json.loads(row[0])
+        res = self._restore(res, values)
+        res["text"] = text
+        res["memory"] = round(score, 3)
+        return res
+
+    def _nearest(self, key: Tuple[str, ...], grams: set) -> Tuple[Any, float]:
+        marks = ",".join("?" * len(grams))
+        rows = self._db.execute(
+            "SELECT s.id, s.size, COUNT(*) AS n FROM grams g "
+            "JOIN segments s ON s.id = g.seg "
+            f"WHERE g.gram IN ({marks}) AND s.engine=? AND s.sl=? AND s.tl=? "
+            "AND s.kinds=? GROUP BY s.id ORDER BY n DESC LIMIT 16",
+            tuple(grams) + key,
+        ).fetchall()
+        best, score = None, 0.0
+        for seg, size, n in rows:
+            similarity = n / (len(grams) + size - n)
+            if similarity > score:
+                best, score = seg, similarity
+        if best is None or score < self.threshold:
+            return None, 0.0
+        row = self._db.execute("SELECT value FROM segments WHERE id=?", (best,))
+        return row.fetchone(), score
+
+    def add(
+        self, engine: str, sl: str, tl: str, text: str, res: Dict[str, Any]
+    ) -> bool:
+        if len(text) > self.max_length or "memory" in res:
+            return False
+        norm, values, kinds = self.mask(text)
+        masked = self._mask_result(res, values, kinds)
+        if masked is None:
+            return False
+        grams = self.grams(norm)
+        with self._lock:
+            try:
+                self._db.execute(
+                    "DELETE FROM grams WHERE seg IN (SELECT id FROM segments "
+                    "WHERE engine=? AND sl=? AND tl=? AND norm=?)",
+                    (engine, sl, tl, norm),
+                )
+                cur = self._db.execute(
+                    "INSERT OR REPLACE INTO segments "
+                    "(engine, sl, tl, norm, kinds, size, value, mtime) "
+                    "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (
+                        engine,
+                        sl,
+                        tl,
+                        norm,
+                        ",".join(kinds),
+                        len(grams),
+                        json.dumps(masked),
+                        time.time(),
+                    ),
+                )
+                seg = cur.lastrowid
+                self._db.executemany(
+                    "INSERT INTO grams VALUES (?, ?)", [(g, seg) for g in grams]
+                )
+                self._db.commit()
+            except Exception:
+                return False
+        return True
+
+    # 把译文中出现的原始值替换为 ⟦i⟧; 有值在主译文中找不到时不记忆.
+    # 数字只防止匹配到更长数字的一部分, 中文译文里数字常紧挨着汉字
+    def _mask_result(
+        self, res: Dict[str, Any], values: List[str], kinds: List[str]
+    ) -> Optional[Dict[str, Any]]:
+        if len(set(values)) != len(values):
+            return None
+        patterns = [
+            (
+                i,
+                re.compile(
+                    r"(?<!\d)(?<!\d[.,])" + re.escape(v) + r"(?!\d)(?![.,]\d)"
+                    if kinds[i] == "number"
+                    else re.escape(v)
+                ),
+            )
+            for i, v in sorted(enumerate(values), key=lambda x: -len(x[1]))
+        ]
+        primary = res.get("definition") or ""
+        if not isinstance(primary, str):
+            return None
+        if any(not p.search(primary) for _, p in patterns):
+            return None
+
+        def mask(value: Any) -> Any:
+            if isinstance(value, str):
+                for i, pattern in patterns:
+                    value = pattern.sub("\u27e6{}\u27e7".format(i), value)
+                return value
+            if isinstance(value, list):
+                return [mask(x) for x in value]
+            return value
+
+        return {k: v if k in BASE_FIELDS else mask(v) for k, v in res.items()}
+
+    def _restore(self, res: Dict[str, Any], values: List[str]) -> Dict[str, Any]:
+        def restore(value: Any) -> Any:
+            if isinstance(value, str):
+                for i, v in enumerate(values):
+                    value = value.replace("\u27e6{}\u27e7".format(i), v)
+                return value
+            if isinstance(value, list):
+                return [restore(x) for x in value]
+            return value
+
+        return {k: restore(v) for k, v in res.items()}
+
+
+# ----------------------------------------------------------------------
+# 合并在途请求: 相同 (引擎, sl, tl, text) 的并发查询只发出一次请求,
+# 其余调用方 (线程或协程) 等待并共享同一个结果
+# ----------------------------------------------------------------------
+class SingleFlight:
+    class Call:
+        __slots__ = ("event", "result", "error", "waiters")
+
+        def __init__(self) -> None:
+            self.event = threading.Event()
+            self.result: Any = None
+            self.error: Optional[BaseException] = None
+            self.waiters: List[Tuple[Any, Any]] = []
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._calls: Dict[Any, "SingleFlight.Call"] = {}
+
+    # 返回 (call, 当前调用方是否负责发出请求)
+    def claim(self, key: Any) -> Tuple["SingleFlight.Call", bool]:
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                return call, False
+            call = self._calls[key] = SingleFlight.Call()
+            return call, True
+
+    def finish(
+        self,
+        key: Any,
+        call: "SingleFlight.Call",
+        result: Any = None,
+        error: Optional[BaseException] = None,
+    ) -> None:
+        call.result, call.error = result, error
+        with self._lock:
+            if self._calls.get(key) is call:
+                del self._calls[key]
+            call.event.set()
+            waiters, call.waiters = call.waiters, []
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f: f.done() or f.set_result(None), future)
+
+    # 结果可能被调用方修改, 等待方拿到的是副本
+    def wait(self, call: "SingleFlight.Call") -> Any:
+        import copy
+
+        call.event.wait()
+        if call.error is not None:
+            raise call.error
+        return copy.deepcopy(call.result)
+
+    async def await_call(self, call: "SingleFlight.Call") -> Any:
+        import asyncio
+
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        with self._lock:
+            if call.event.is_set():
+                future.set_result(None)
+            else:
+                call.waiters.append((loop, future))
+        await future
+        return self.wait(call)
+
+    def do(self, key: Any, fn) -> Any:
+        call, leader = self.claim(key)
+        if not leader:
+            return self.wait(call)
+        try:
+            result = fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+    async def ado(self, key: Any, fn) -> Any:
+        call, leader = self.claim(key)
+        if not leader:
+            return await self.await_call(call)
+        try:
+            result = await fn()
+        except BaseException as e:
+            self.finish(key, call, error=e)
+            raise
+        self.finish(key, call, result)
+        return result
+
+
+IN_FLIGHT = SingleFlight()
+
+
+# ----------------------------------------------------------------------
+# 熔断: 每个引擎连续失败 breaker_threshold 次后, breaker_cooldown 秒内
+# 直接失败, 冷却后放行一次试探请求
+# ----------------------------------------------------------------------
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+class CircuitBreaker:
+    _breakers: Dict[str, "CircuitBreaker"] = {}
+    _breakers_lock = threading.Lock()
+
+    def __init__(self, name: str, threshold: int = 5, cooldown: float = 30) -> None:
+        self.name = name
+        self.threshold = threshold
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened: Optional[float] = None
+        self.trial = False
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, name: str, config: Dict[str, Any]) -> "CircuitBreaker":
+        with cls._breakers_lock:
+            breaker = cls._breakers.get(name)
+            if breaker is None:
+                breaker = cls(
+                    name,
+                    int(config.get("breaker_threshold", 5)),
+                    float(config.get("breaker_cooldown", 30)),
+                )
+                cls._breakers[name] = breaker
+        return breaker
+
+    def allow(self) -> bool:
+        with self._lock:
+            if self.opened is None:
+                return True
+            if not self.trial and time.time() - self.opened >= self.cooldown:
+                self.trial = True
+                return True
+            return False
+
+    # 只查询状态, 不占用半开状态的试探机会
+    def is_open(self) -> bool:
+        with self._lock:
+            if self.opened is None:
+                return False
+            return time.time() - self.opened < self.cooldown
+
+    def check(self) -> None:
+        if not self.allow():
+            raise CircuitOpenError(f"{self.name}: circuit open after failures")
+
+    def success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened = None
+            self.trial = False
+
+    def failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial = False
+            if self.threshold and self.failures >= self.threshold:
+                self.opened = time.time()
+
+
+# Retry-After: 秒数或 HTTP 日期
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        from email.utils import parsedate_to_datetime
+
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# 限速: 按 (引擎, apikey) 的令牌桶, 分别限制请求数和字符数
+#   qps = 10       # 每秒请求数, 0 不限制
+#   cps = 2000     # 每秒字符数, 0 不限制
+#   burst = 1      # 桶容量, 单位为秒
+#   ratelimit_file = "~/.cache/translator/ratelimit.json"  # 多进程共享, 空为进程内
+# 调用方先预订令牌 (余额可以为负), 再等待余额回正所需的时间, 因此并发
+# 请求会按顺序排队而不是忙等
+# ----------------------------------------------------------------------
+class RateLimiter:
+    _limiters: Dict[str, "RateLimiter"] = {}
+    _limiters_lock = threading.Lock()
+
+    def __init__(
+        self,
+        key: str,
+        qps: float = 0,
+        cps: float = 0,
+        burst: float = 1,
+        path: Optional[str] = None,
+    ) -> None:
+        self.key = key
+        self.rates = {"requests": qps, "chars": cps}
+        self.burst = burst
+        self.path = Path(path).expanduser() if path else None
+        self.state: Dict[str, List[float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def get(cls, name: str, config: Dict[str, Any]) -> Optional["RateLimiter"]:
+        qps = float(config.get("qps") or 0)
+        cps = float(config.get("cps") or 0)
+        if not qps and not cps:
+            return None
+        key = name
+        if config.get("apikey"):
+            import hashlib
+
+            key += ":" + hashlib.md5(config["apikey"].encode("utf-8")).hexdigest()[:8]
+        with cls._limiters_lock:
+            limiter = cls._limiters.get(key)
+            if limiter is None:
+                path = config.get(
+                    "ratelimit_file", "~/.cache/translator/ratelimit.json"
+                )
+                burst = float(config.get("burst") or 1)
+                limiter = cls(key, qps, cps, burst, path)
+                cls._limiters[key] = limiter
+        return limiter
+
+    # 预订一次请求和 chars 个字符, 返回需要等待的秒数
+    def reserve(self, chars: int = 0) -> float:
+        with self._lock:
+            if self.path is None:
+                return self._reserve(self.state, chars)
+            try:
+                return self._reserve_shared(chars)
+            except OSError:
+                return self._reserve(self.state, chars)
+
+    def _reserve(self, state: Dict[str, List[float]], chars: int) -> float:
+        now = time.time()
+        wait = 0.0
+        for kind, cost in (("requests", 1), ("chars", chars)):
+            rate = self.rates[kind]
+            if not rate or not cost:
+                continue
+            capacity = rate * self.burst
+            tokens, stamp = state.get(kind, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * rate) - cost
+            state[kind] = [tokens, now]
+            if tokens < 0:
+                wait = max(wait, -tokens / rate)
+        return wait
+
+    # 状态文件: {key: {"requests": [tokens, time], "chars": [tokens, time]}}
+    def _reserve_shared(self, chars: int) -> float:
+        try:
+            import fcntl
+        except ImportError:
+            return self._reserve(self.state, chars)
+        assert self.path is not None
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a+") as fh:
+            fcntl.flock(fh, fcntl.LOCK_EX)
+            try:
+                fh.seek(0)
+                try:
+                    states = json.loads(fh.read() or "{}")
+                except ValueError:
+                    states = {}
+                state = states.setdefault(self.key, {})
+                wait = self._reserve(state, chars)
+                fh.seek(0)
+                fh.truncate()
+                fh.write(json.dumps(states))
+                fh.flush()
+            finally:
+                fcntl.flock(fh, fcntl.LOCK_UN)
+        return wait
+
+
+# ----------------------------------------------------------------------
+# 异步 HTTP: 进程内共享的 aiohttp 连接池 (keep-alive, 按主机限制连接数)
+# ----------------------------------------------------------------------
+class HttpResponse:
+    """Buffered response exposing the parts of requests.Response engines use."""
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: Dict[str, str],
+        content: bytes,
+        url: str = "",
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.content = content
+        self.url = url
+        self.encoding = "utf-8"
+        self.elapsed: Any = None
+
+    @property
+    def ok(self) -> bool:
+        return 200 <= self.status_code < 400
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+    @property
+    def text(self) -> str:
+        return self.content.decode("utf-8", errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size: int = 1, decode_unicode: bool = False) -> Any:
+        for i in range(0, len(self.content), max(1, chunk_size)):
+            chunk = self.content[i : i + chunk_size]
+            yield chunk.decode("utf-8", errors="replace") if decode_unicode else chunk
+
+    def close(self) -> None:
+        pass
+
+
+class HttpPool:
+    """Process-wide sessions keyed by scheme, host and proxy.
+
+    Every translator instance, of any engine, reuses the warm connections of
+    the session for its host instead of opening its own.
+
+    config ([default] or engine section, the first request to a host wins):
+        pool_per_host = 32   # keep-alive connections per host
+        http2 = false        # use httpx with HTTP/2 (pip install httpx[http2])
+
+    Without httpx the requests session is used, with a warning printed once.
+    """
+
+    _sessions: Dict[Tuple[str, str, bool], Any] = {}
+    _lock = threading.Lock()
+    _http2_warned = False
+    # --record/--replay: 请求经过 FixtureStore 录制或回放
+    fixtures: Optional["FixtureStore"] = None
+
+    @classmethod
+    def use(cls, fixtures: Optional["FixtureStore"]) -> None:
+        cls.close()
+        cls.fixtures = fixtures
+
+    @classmethod
+    def session(cls, url: str, config: Dict[str, Any]) -> Any:
+        origin = "/".join(url.split("/", 3)[:3])
+        http2 = str(config.get("http2", "")).lower() in ("1", "true", "yes")
+        key = (origin, config.get("proxy") or "", http2)
+        session = cls._sessions.get(key)
+        if session is not None:
+            return session
+        with cls._lock:
+            session = cls._sessions.get(key)
+            if session is None and cls.fixtures and cls.fixtures.mode == "replay":
+                session = FixtureSession(cls.fixtures, None)
+                cls._sessions[key] = session
+            if session is None:
+                size = int(config.get("pool_per_host") or 32)
+                if http2:
+                    try:
+                        session = Http2Session(
+                            size, key[1], int(config.get("pool_size") or 100)
+                        )
+                    except ImportError as e:
+                        if not cls._http2_warned:
+                            cls._http2_warned = True
+                            msg = f"http2 disabled, using requests: {e}"
+                            sys.stderr.write(f"{RED}{msg}{RESET}\n")
+                if session is None:
+                    import requests  # type: ignore [import-untyped]
+                    from requests.adapters import HTTPAdapter  # type: ignore [import-untyped]
+
+                    session = requests.Session()
+                    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=size)
+                    session.mount("http://", adapter)
+                    session.mount("https://", adapter)
+                if cls.fixtures is not None:
+                    session = FixtureSession(cls.fixtures, session)
+                cls._sessions[key] = session
+        return session
+
+    @classmethod
+    def close(cls) -> None:
+        with cls._lock:
+            sessions, cls._sessions = cls._sessions, {}
+        for session in sessions.values():
+            session.close()
+
+
+class Http2Session:
+    """httpx.Client with HTTP/2 behind the subset of requests.Session used here.
+
+    Responses are read in full and wrapped in HttpResponse; transport errors
+    are raised as requests.RequestException so the retry logic is unchanged.
+    """
+
+    def __init__(self, per_host: int, proxy: str = "", total: int = 100) -> None:
+        import httpx
+
+        limits = httpx.Limits(max_connections=total, max_keepalive_connections=per_host)
+        self.client = httpx.Client(http2=True, limits=limits, proxy=proxy or None)
+
+    def get(self, url: str, **kargv: Any) -> HttpResponse:
+        return self.send("GET", url, **kargv)
+
+    def post(self, url: str, **kargv: Any) -> HttpResponse:
+        return self.send("POST", url, **kargv)
+
+    def send(self, method: str, url: str, **kargv: Any) -> HttpResponse:
+        import httpx
+        import requests  # type: ignore [import-untyped]
+
+        kargv.pop("proxies", None)
+        kargv.pop("stream", None)
+        data = kargv.get("data")
+        if isinstance(data, (str, bytes)):
+            kargv["content"] = kargv.pop("data")
+        try:
+            r = self.client.request(method, url, **kargv)
+        except httpx.HTTPError as e:
+            raise requests.ConnectionError(str(e)) from e
+        resp = HttpResponse(r.status_code, dict(r.headers), r.content, str(r.url))
+        resp.elapsed = r.elapsed
+        return resp
+
+    def close(self) -> None:
+        self.client.close()
+
+
+class FixtureStore:
+    """HTTP exchanges saved as JSON files in a directory.
+
+    mode "record" passes requests through and saves every response; mode
+    "replay" answers from the saved files without touching the network,
+    after ``latency`` plus up to ``jitter`` seconds. Fixture keys cover the
+    method, URL, query and body but not headers or the volatile fields in
+    ``VOLATILE`` (salt, sign, ...), so requests built at another time
+    still match.
+    """
+
+    VOLATILE = frozenset(["salt", "sign", "curtime", "_"])
+
+    def __init__(
+        self, path: str, mode: str, latency: float = 0.0, jitter: float = 0.0
+    ) -> None:
+        self.path = Path(os.path.expanduser(path))
+        self.mode = mode
+        self.latency = latency
+        self.jitter = jitter
+        self._cache: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+        if mode == "record":
+            self.path.mkdir(parents=True, exist_ok=True)
+
+    def _strip(self, value: Any) -> Any:
+        if isinstance(value, dict):
+            return sorted((k, v) for k, v in value.items() if k not in self.VOLATILE)
+        return value
+
+    # 文件名: host_哈希.json, 哈希覆盖去掉易变字段后的请求
+    def key(self, method: str, url: str, kargv: Dict[str, Any]) -> str:
+        import hashlib
+        from urllib.parse import parse_qsl, urlsplit
+
+        parts = urlsplit(url)
+        # 重复的参数 (dt=, to=) 逐个保留, 不能合并成字典
+        query = parse_qsl(parts.query, keep_blank_values=True)
+        params = kargv.get("params") or {}
+        query += list(params.items()) if isinstance(params, dict) else list(params)
+        query = sorted((k, str(v)) for k, v in query if k not in self.VOLATILE)
+        body = kargv.get("data")
+        if isinstance(body, (str, bytes)):
+            try:
+                body = json.loads(body)
+            except ValueError:
+                body = (
+                    body.decode("utf-8", "replace") if isinstance(body, bytes) else body
+                )
+        if kargv.get("json") is not None:
+            body = kargv["json"]
+        material = [method, f"{parts.scheme}://{parts.netloc}{parts.path}"]
+        material += [query, self._strip(body)]
+        text = json.dumps(material, sort_keys=True, ensure_ascii=False, default=str)
+        digest = hashlib.sha1(text.encode("utf-8")).hexdigest()[:20]
+        return re.sub(r"[^\w.-]", "_", parts.netloc) + "_" + digest
+
+    def load(self, key: str) -> Optional[HttpResponse]:
+        import base64
+
+        with self._lock:
+            if key not in self._cache:
+                try:
+                    data = json.loads((self.path / (key + ".json")).read_text("utf-8"))
+                except (OSError, ValueError):
+                    data = None
+                self._cache[key] = data
+            data = self._cache[key]
+        if data is None:
+            return None
+        content = data.get("text", "").encode("utf-8")
+        if "base64" in data:
+            content = base64.b64decode(data["base64"])
+        return HttpResponse(data["status"], dict(data["headers"]), content, data["url"])
+
+    def save(self, key: str, method: str, url: str, resp: Any) -> None:
+        import base64
+
+        data: Dict[str, Any] = {"method": method, "url": url}
+        data["status"] = resp.status_code
+        data["headers"] = {
+            k: v
+            for k, v in resp.headers.items()
+            if k.lower() not in ("content-encoding", "transfer-encoding", "set-cookie")
+        }
+        try:
+            data["text"] = resp.content.decode("utf-8")
+        except UnicodeDecodeError:
+            data["base64"] = base64.b64encode(resp.content).decode("ascii")
+        tmp = self.path / f"{key}.{threading.get_ident()}.tmp"
+        tmp.write_text(json.dumps(data, ensure_ascii=False, indent=1), "utf-8")
+        os.replace(tmp, self.path / (key + ".json"))
+        with self._lock:
+            self._cache[key] = data
+
+    def delay(self) -> float:
+        import random
+
+        return self.latency + random.uniform(0, self.jitter)
+
+
+class FixtureSession:
+    """Session wrapper that records through ``inner`` or replays fixtures."""
+
+    def __init__(self, store: FixtureStore, inner: Any) -> None:
+        self.store = store
+        self.inner = inner
+
+    def get(self, url: str, **kargv: Any) -> Any:
+        return self.send("GET", url, **kargv)
+
+    def post(self, url: str, **kargv: Any) -> Any:
+        return self.send("POST", url, **kargv)
+
+    def send(self, method: str, url: str, **kargv: Any) -> Any:
+        import requests  # type: ignore [import-untyped]
+
+        key = self.store.key(method, url, kargv)
+        if self.inner is None:
+            time.sleep(self.store.delay())
+            resp = self.store.load(key)
+            if resp is None:
+                raise requests.ConnectionError(f"no fixture for {method} {url}")
+            return resp
+        send = self.inner.post if method == "POST" else self.inner.get
+        resp = send(url, **kargv)
+        self.store.save(key, method, url, resp)
+        return resp
+
+    def close(self) -> None:
+        if self.inner is not None:
+            self.inner.close()
+
+
+class AsyncHttpPool:
+    """One aiohttp.ClientSession per event loop, shared by every translator.
+
+    config ([default] section of config.toml):
+        pool_size = 100      # total connections
+        pool_per_host = 32   # connections per host, 0 means unlimited
+    """
+
+    _sessions: Dict[Any, Any] = {}
+
+    @classmethod
+    def session(cls, config: Dict[str, Any]) -> Any:
+        import asyncio
+
+        import aiohttp
+
+        loop = asyncio.get_running_loop()
+        session = cls._sessions.get(loop)
+        if session is None or session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=int(config.get("pool_size") or 100),
+                limit_per_host=int(config.get("pool_per_host") or 32),
+                keepalive_timeout=30,
+            )
+            session = aiohttp.ClientSession(connector=connector)
+            cls._sessions[loop] = session
+        return session
+
+    # 在事件循环结束前调用, 关闭当前循环的连接池
+    @classmethod
+    async def close(cls) -> None:
+        import asyncio
+
+        session = cls._sessions.pop(asyncio.get_running_loop(), None)
+        if session is not None:
+            await session.close()
 
 
 # ----------------------------------------------------------------------
 # Azure Translator
 # ----------------------------------------------------------------------
 class AzureTranslator(BasicTranslator):
+    requires = ("apikey",)
+    batch_size = 1000
+    batch_chars = 50000
+    max_chars = 10000
+
     def __init__(self, **argv):
         super().__init__("azure", **argv)
         if "apikey" not in self._config:
             sys.stderr.write("error: missing apikey in [azure] section\n")
             sys.exit()
         self.apikey = self._config["apikey"]
-
-    def translate(self, sl, tl, text):
-        import uuid
-
-        sl, tl = self.guess_language(sl, tl, text)
-        qs = self.url_quote(sl)
-        qt = self.url_quote(tl)
-        url = "https://api.cognitive.microsofttranslator.com/translate"
-        url += "?api-version=3.0&from={}&to={}".format(qs, qt)
-        headers = {
+        self.static_headers = {
             "Ocp-Apim-Subscription-Key": self.apikey,
             "Content-type": "application/json",
-            "X-ClientTraceId": str(uuid.uuid4()),
         }
-        body = [{"text": text}]
-        import json
+        url = self._config.get("url") or (
+            "https://api.cognitive.microsofttranslator.com/translate"
+        )
+        self.url = url + "?api-version=3.0"
+
+    def prepare_many(self, sl, tl, texts):
+        import uuid
+
+        url = self.url
+        # 不传 from 时由服务端识别; tl 可以是多个目标语言
+        if sl and sl != "auto":
+            url += "&from=" + self.url_quote(sl)
+        for x in tl if isinstance(tl, list) else [tl]:
+            url += "&to=" + self.url_quote(x)
+        headers = {"X-ClientTraceId": str(uuid.uuid4())}
+        body = [{"text": text} for text in texts]
+        return {"url": url, "data": json.dumps(body), "post": True, "header": headers}
+
+    @override
+    def prepare(self, sl, tl, text):
+        return self.prepare_many(sl, tl, [text])
 
-        resp = self.http_post(url, data=json.dumps(body), headers=headers).json()
+    @override
+    def parse(self, sl, tl, text, r):
+        resp = r.json()
         # print(resp)
-        res = {}
-        res["text"] = text
-        res["sl"] = sl
-        res["tl"] = tl
-        res["translation"] = self.render(resp)
-        res["html"] = None
-        res["xterm"] = None
+        return self._result(sl, tl, text, resp)
+
+    def _result(self, sl, tl, text, resp):
+        res = self.create_translation(sl, tl, text)
+        res["definition"] = self.render(resp)
         return res
 
+    @override
+    def translate_many(self, sl, tl, texts):
+        sl, tl = self.guess_language(sl, tl, texts[0] if texts else "")
+        results = [None] * len(texts)
+        for group in self.pack_segments(texts):
+            req = self.prepare_many(sl, tl, [texts[i] for i in group])
+            req["chars"] = sum(len(texts[i]) for i in group)
+            resp = self.request(**req).json()
+            if not isinstance(resp, list) or len(resp) != len(group):
+                continue
+            for index, item in zip(group, resp):
+                results[index] = self._result(sl, tl, texts[index], [item])
+        return results
+
+    # 一次请求带多个 to=, translations 按请求顺序返回各目标语言的译文
+    @override
+    def translate_targets(self, sl, targets, text):
+        pairs = [self.guess_language(sl, tl, text) for tl in targets]
+        xtls = [xtl for _, xtl in pairs]
+        req = self.prepare_many(pairs[0][0], xtls, [text])
+        req["chars"] = len(text) * len(targets)
+        resp = self.request(**req).json()
+        items = []
+        if isinstance(resp, list) and resp and isinstance(resp[0], dict):
+            items = resp[0].get("translations") or []
+        results = {}
+        for index, (tl, (xsl, xtl)) in enumerate(zip(targets, pairs)):
+            if len(items) != len(targets):
+                results[tl] = None
+                continue
+            res = self.create_translation(xsl, xtl, text)
+            res["definition"] = items[index]["text"]
+            results[tl] = self.select_fields(res)
+        return results
+
     def render(self, resp):
         if not resp:
             return ""
@@ -286,59 +2311,98 @@ class AzureTranslator(BasicTranslator):
         y = x["translations"]
         if not y:
             return ""
-        output = ""
-        for item in y:
-            output += item["text"] + "\n"
-        return output
+        return "\n".join(item["text"] for item in y)
 
 
 # ----------------------------------------------------------------------
 # Google Translator
 # ----------------------------------------------------------------------
 class GoogleTranslator(BasicTranslator):
+    # 长文本改用 POST 发送, 不受 URL 长度限制
+    max_chars = 5000
+
+    # dt 返回的内容: t 译文, rm 音标, bd 词典, md 释义, at 候选译文,
+    # ex 例句, ss 同义词, rw 相关词, ld 语种识别, qca 拼写纠正
+    dt = ["at", "bd", "ex", "ld", "md", "qca", "rw", "rm", "ss", "t"]
+
+    # 未指定 dt 时按 fields 只请求需要的部分
+    field_dt = {
+        "phonetic": ["t", "rm"],
+        "definition": ["t"],
+        "explain": ["bd"],
+        "detail": ["md"],
+        "alternative": ["t", "at"],
+    }
+
     def __init__(self, **argv):
         super().__init__("google", **argv)
         self._agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
+        dt = self._options.get("dt") or self._config.get("dt")
+        if dt:
+            self.dt = [x.strip() for x in dt.split(",") if x.strip()]
+        elif self.fields is not None:
+            wanted = {x for f in self.fields for x in self.field_dt.get(f, [])}
+            self.dt = [x for x in GoogleTranslator.dt if x in wanted] or ["t"]
 
-    def get_url(self, sl, tl, qry):
+    @override
+    def cache_name(self):
+        name = super().cache_name()
+        if self.dt == GoogleTranslator.dt:
+            return name
+        return "{}:dt={}".format(name, ",".join(self.dt))
+
+    def get_url(self, sl, tl, qry=None):
         http_host = self._config.get("host", "translate.googleapis.com")
-        qry = self.url_quote(qry)
-        url = (
-            "https://{}/translate_a/single?client=gtx&sl={}&tl={}&dt=at&dt=bd&dt=ex&"
-            "dt=ld&dt=md&dt=qca&dt=rw&dt=rm&dt=ss&dt=t&q={}".format(
-                http_host, sl, tl, qry
-            )
-        )  # noqa: E216
+        url = self._config.get("url") or f"https://{http_host}/translate_a/single"
+        url += "?client=gtx&sl={}&tl={}".format(sl, tl)
+        url += "".join("&dt=" + x for x in self.dt)
+        if qry is not None:
+            url += "&q=" + self.url_quote(qry)
         return url
 
-    def translate(self, sl, tl, text):
-        sl, tl = self.guess_language(sl, tl, text)
-        self.text = text
-        url = self.get_url(sl, tl, text)
-        r = self.http_get(url)
+    # 编码后的文本超过 post_threshold 时放到表单请求体中
+    @override
+    def prepare(self, sl, tl, text):
+        threshold = int(self._config.get("post_threshold") or 2000)
+        if len(self.url_quote(text)) > threshold:
+            return {"url": self.get_url(sl, tl), "data": {"q": text}, "post": True}
+        return {"url": self.get_url(sl, tl, text)}
+
+    @override
+    def parse(self, sl, tl, text, r):
         if not r:
             return None
         try:
-            obj = r.json()
+            with TracePhase("decode"):
+                obj = r.json()
         except Exception:
             return None
         res = self.create_translation(sl, tl, text)
-        res["phonetic"] = self.get_phonetic(obj)
-        res["definition"] = self.get_definition(obj)
-        res["explain"] = self.get_explain(obj)
-        res["detail"] = self.get_detail(obj)
-        res["alternative"] = self.get_alternative(obj)
+        definition = None
+        if self.wants("definition") or self.wants("alternative"):
+            definition = self.get_definition(obj)
+        if self.wants("phonetic"):
+            res["phonetic"] = self.get_phonetic(obj)
+        res["definition"] = definition
+        if self.wants("explain"):
+            with TracePhase("explain"):
+                res["explain"] = self.get_explain(obj)
+        if self.wants("detail"):
+            with TracePhase("detail"):
+                res["detail"] = self.get_detail(obj)
+        if self.wants("alternative"):
+            res["alternative"] = self.get_alternative(obj, definition)
         return res
 
     def get_phonetic(self, obj):
-        for x in obj[0]:
+        for x in obj[0] or []:
             if len(x) == 4:
                 return x[3]
         return None
 
     def get_definition(self, obj):
         paraphrase = ""
-        for x in obj[0]:
+        for x in obj[0] or []:
             if x[0]:
                 paraphrase += x[0]
         return paraphrase
@@ -355,7 +2419,7 @@ class GoogleTranslator(BasicTranslator):
 
     def get_detail(self, resp):
         result = []
-        if len(resp) < 13:
+        if len(resp) < 13 or not resp[12]:
             return None
         for x in resp[12]:
             result.append("[{}]".format(x[0]))
@@ -365,10 +2429,11 @@ class GoogleTranslator(BasicTranslator):
                     result.append("  * {}".format(y[2]))
         return result
 
-    def get_alternative(self, resp):
-        definition = self.get_definition(resp)
+    def get_alternative(self, resp, definition=None):
+        if definition is None:
+            definition = self.get_definition(resp)
         result = []
-        if len(resp) < 6:
+        if len(resp) < 6 or not resp[5]:
             return None
         for x in resp[5]:
             # result.append('- {}'.format(x[0]))
@@ -382,51 +2447,60 @@ class GoogleTranslator(BasicTranslator):
 # Youdao Translator
 # ----------------------------------------------------------------------
 class YoudaoTranslator(BasicTranslator):
+    max_chars = 2000
+    languages = frozenset(
+        ["zh", "en", "ja", "ko", "fr", "de", "es", "pt", "it", "ru", "vi", "id", "ar"]
+    )
+    static_headers = {
+        "Cookie": "OUTFOX_SEARCH_USER_ID=-2022895048@10.168.8.76;",
+        "Referer": "http://fanyi.youdao.com/",
+        "User-Agent": "Mozilla/5.0 (Windows NT 6.2; rv:51.0) Gecko/20100101 Firefox/51.0",
+    }
+
     def __init__(self, **argv):
+        import hashlib
+
         super().__init__("youdao", **argv)
-        self.url = (
-            "https://fanyi.youdao.com/translate_o?smartresult=dict&smartresult=rule"
-        )
+        url = self._config.get("url") or "https://fanyi.youdao.com/translate_o"
+        self.url = url + "?smartresult=dict&smartresult=rule"
+        # 不需要 explain 时不请求词典结果
+        self.smartresult = "dict" if self.wants("explain") else "rule"
+        if not self.wants("explain"):
+            self.url = url + "?smartresult=rule"
         self.D = "ebSeFb%=XZ%T[KZ)c(sy!"
         self.D = "97_3(jkMYg@T[KZQmqjTK"
-
-    def get_md5(self, value):
-        import hashlib
-
-        m = hashlib.md5()
-        # m.update(value)
-        m.update(value.encode("utf-8"))
-        return m.hexdigest()
-
-    def sign(self, text, salt):
-        s = "fanyideskweb" + text + salt + self.D
-        return self.get_md5(s)
-
-    def translate(self, sl, tl, text):
-        sl, tl = self.guess_language(sl, tl, text)
-        self.text = text
-        salt = str(int(time.time() * 1000) + random.randint(0, 10))
-        sign = self.sign(text, salt)
-        header = {
-            "Cookie": "OUTFOX_SEARCH_USER_ID=-2022895048@10.168.8.76;",
-            "Referer": "http://fanyi.youdao.com/",
-            "User-Agent": "Mozilla/5.0 (Windows NT 6.2; rv:51.0) Gecko/20100101 Firefox/51.0",
-        }
-        data = {
-            "i": text,
-            "from": sl,
-            "to": tl,
-            "smartresult": "dict",
+        # 固定的表单字段和签名前缀只构造一次, 每次请求只填 text/salt/sign
+        self.form = {
+            "smartresult": self.smartresult,
             "client": "fanyideskweb",
-            "salt": salt,
-            "sign": sign,
             "doctype": "json",
             "version": "2.1",
             "keyfrom": "fanyi.web",
             "action": "FY_BY_CL1CKBUTTON",
             "typoResult": "true",
         }
-        r = self.http_post(self.url, data=data, headers=header)
+        self._digest = hashlib.md5(b"fanyideskweb")
+
+    def sign(self, text, salt):
+        m = self._digest.copy()
+        m.update((text + salt + self.D).encode("utf-8"))
+        return m.hexdigest()
+
+    @override
+    def prepare(self, sl, tl, text):
+        import random
+
+        salt = str(int(time.time() * 1000) + random.randint(0, 10))
+        data = dict(self.form)
+        data["i"] = text
+        data["from"] = sl
+        data["to"] = tl
+        data["salt"] = salt
+        data["sign"] = self.sign(text, salt)
+        return {"url": self.url, "data": data, "post": True}
+
+    @override
+    def parse(self, sl, tl, text, r):
         if not r:
             return None
         try:
@@ -435,8 +2509,10 @@ class YoudaoTranslator(BasicTranslator):
             return None
         # pprint.pprint(obj)
         res = self.create_translation(sl, tl, text)
-        res["definition"] = self.get_definition(obj)
-        res["explain"] = self.get_explain(obj)
+        if self.wants("definition"):
+            res["definition"] = self.get_definition(obj)
+        if self.wants("explain"):
+            res["explain"] = self.get_explain(obj)
         return res
 
     def get_definition(self, obj):
@@ -468,59 +2544,156 @@ class YoudaoTranslator(BasicTranslator):
 # ----------------------------------------------------------------------
 # Bing2: 免费 web 接口，只能查单词
 # ----------------------------------------------------------------------
+class BingDictParser:
+    """Incremental scanner for the SerpHoverTrans page.
+
+    ``feed`` takes decoded chunks and returns True once everything wanted
+    has been found: the first phonetic, and the explain list up to its
+    closing ``</ul>``. Only a bounded tail is kept between chunks.
+    """
+
+    PHONETIC = re.compile(r'<span class="ht_attr" lang=".*?">\[(.*?)\] </span>')
+    EXPLAIN = re.compile(
+        r'<span class="ht_pos">(.*?)</span><span class="ht_trs">(.*?)</span>'
+    )
+    # 跨块的匹配最多保留这么多字符
+    window = 4096
+    # Content-Length 不超过这个字节数时整体解析, 分块的开销比扫描还大
+    stream_threshold = 16384
+
+    def __init__(self, phonetic: bool = True, explain: bool = True) -> None:
+        self.phonetic: Optional[str] = None
+        self.explain: List[str] = []
+        self.size = 0
+        self._phonetic = phonetic
+        self._explain = explain
+        self._buffer = ""
+
+    @property
+    def done(self) -> bool:
+        return not (self._phonetic or self._explain)
+
+    def feed(self, chunk: str) -> bool:
+        if self.done:
+            return True
+        self.size += len(chunk)
+        buf = self._buffer + chunk
+        start = 0
+        if self._phonetic:
+            m = self.PHONETIC.search(buf)
+            if m:
+                self.phonetic = m.group(1).strip()
+                self._phonetic = False
+                start = m.end()
+        if self._explain:
+            found = self.EXPLAIN.findall(buf, start)
+            if found:
+                self.explain += ["%s %s" % x for x in found]
+                # 列表在最后一项之后结束; 否则从最后一个匹配之后继续
+                if buf.rfind("</ul>") > buf.rfind('<span class="ht_trs">'):
+                    self._explain = False
+                else:
+                    *_, m = self.EXPLAIN.finditer(buf, start)
+                    start = m.end()
+            elif self.explain and "</ul>" in buf:
+                self._explain = False
+        if self.done:
+            self._buffer = ""
+            return True
+        self._buffer = buf[max(start, len(buf) - self.window) :]
+        return False
+
+    # 读取响应直到找齐需要的内容, 剩余部分只读不扫描以便复用连接
+    def feed_response(self, resp: Any, chunk_size: int = 8192) -> "BingDictParser":
+        import codecs
+
+        decoder = codecs.getincrementaldecoder(resp.encoding or "utf-8")("replace")
+        chunks = resp.iter_content(chunk_size)
+        for chunk in chunks:
+            if self.feed(decoder.decode(chunk)):
+                for _ in chunks:
+                    pass
+                break
+        else:
+            self.feed(decoder.decode(b"", True))
+        return self
+
+
 class BingDict(BasicTranslator):
+    languages = frozenset(["zh", "en"])
+    words_only = True
+    static_headers = {
+        # 'Host': 'cn.bing.com',
+        "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
+        "Accept-Language": "en-US,en;q=0.5",
+    }
+
     def __init__(self, **argv):
         super().__init__("bingdict", **argv)
         self._agent = "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/141.0.0.0 Safari/537.36"
         self._url = "http://bing.com/dict/SerpHoverTrans"
         self._cnurl = "http://cn.bing.com/dict/SerpHoverTrans"
+        if self._config.get("url"):
+            self._url = self._cnurl = self._config["url"]
 
-    def translate(self, sl, tl, text):
+    @override
+    def prepare(self, sl, tl, text):
         url = ("zh" in tl) and self._cnurl or self._url
         url = self._cnurl
         url = url + "?q=" + self.url_quote(text)
-        headers = {
-            # 'Host': 'cn.bing.com',
-            "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
-            "Accept-Language": "en-US,en;q=0.5",
-        }
-        resp = self.http_get(url, None, headers)
+        return {"url": url, "stream": True}
+
+    @override
+    def parse(self, sl, tl, text, resp):
         if not resp:
             return None
-        resp = resp.text
+        phonetic, explain = self.wants("phonetic"), self.wants("explain")
+        found = self.read_page(resp, phonetic, explain)
         res = self.create_translation(sl, tl, text)
-        res["sl"] = "auto"
-        res["tl"] = "auto"
-        res["text"] = text
-        res["phonetic"] = self.get_phonetic(resp)
-        res["explain"] = self.get_explain(resp)
+        if phonetic:
+            res["phonetic"] = found[0]
+        if explain:
+            res["explain"] = found[1]
         return res
 
+    # 返回 (phonetic, explain); 小响应整页解析, 大的或长度未知的逐块解析
+    def read_page(self, resp, phonetic=True, explain=True):
+        size = int(resp.headers.get("Content-Length") or -1)
+        if 0 <= size <= BingDictParser.stream_threshold:
+            html = resp.text
+            return (
+                self.get_phonetic(html) if phonetic else None,
+                self.get_explain(html) if explain else [],
+            )
+        parser = BingDictParser(phonetic, explain).feed_response(resp)
+        return (parser.phonetic if parser.size else "", parser.explain)
+
     def get_phonetic(self, html):
         if not html:
             return ""
-        m = re.findall(r'<span class="ht_attr" lang=".*?">\[(.*?)\] </span>', html)
+        m = BingDictParser.PHONETIC.search(html)
         if not m:
             return None
-        return m[0].strip()
+        return m.group(1).strip()
 
     def get_explain(self, html):
         if not html:
             return []
-        m = re.findall(
-            r'<span class="ht_pos">(.*?)</span><span class="ht_trs">(.*?)</span>', html
-        )
-        expls = []
-        for item in m:
-            expls.append("%s %s" % item)
-        return expls
+        return ["%s %s" % m for m in BingDictParser.EXPLAIN.findall(html)]
 
 
 # ----------------------------------------------------------------------
 # Baidu Translator
 # ----------------------------------------------------------------------
 class BaiduTranslator(BasicTranslator):
+    requires = ("apikey", "secret")
+    batch_size = 100
+    batch_chars = 6000
+    max_chars = 2000
+
     def __init__(self, **argv):
+        import hashlib
+
         super().__init__("baidu", **argv)
         if "apikey" not in self._config:
             sys.stderr.write("error: missing apikey in [baidu] section\n")
@@ -537,8 +2710,17 @@ class BaiduTranslator(BasicTranslator):
             "en-us": "en",
             "en-gb": "en",
             "ja": "jp",
+            "fr": "fra",
+            "es": "spa",
+            "ko": "kor",
+            "ar": "ara",
+            "he": "heb",
         }
         self.langmap = langmap
+        self.url = self._config.get("url") or (
+            "https://fanyi-api.baidu.com/api/trans/vip/translate"
+        )
+        self._digest = hashlib.md5(self.apikey.encode("utf-8"))
 
     def convert_lang(self, lang):
         t = lang.lower()
@@ -546,8 +2728,10 @@ class BaiduTranslator(BasicTranslator):
             return self.langmap[t]
         return lang
 
-    def translate(self, sl, tl, text):
-        sl, tl = self.guess_language(sl, tl, text)
+    @override
+    def prepare(self, sl, tl, text):
+        import random
+
         req = {}
         req["q"] = text
         req["from"] = self.convert_lang(sl)
@@ -555,55 +2739,84 @@ class BaiduTranslator(BasicTranslator):
         req["appid"] = self.apikey
         req["salt"] = str(int(time.time() * 1000) + random.randint(0, 10))
         req["sign"] = self.sign(text, req["salt"])
-        url = "https://fanyi-api.baidu.com/api/trans/vip/translate"
-        r = self.http_post(url, data=req)
-        resp = r.json()
-        res = {}
-        res["text"] = text
-        res["sl"] = sl
-        res["tl"] = tl
-        res["info"] = resp
-        res["translation"] = self.render(resp)
-        res["html"] = None
-        res["xterm"] = None
+        return {"url": self.url, "data": req, "post": True}
+
+    @override
+    def parse(self, sl, tl, text, r):
+        return self._result(sl, tl, text, r.json())
+
+    def _result(self, sl, tl, text, resp):
+        res = self.create_translation(sl, tl, text)
+        res["definition"] = self.render(resp)
         return res
 
+    # 多个片段用换行拼接为一个 q, trans_result 按行返回
+    @override
+    def translate_many(self, sl, tl, texts):
+        sl, tl = self.guess_language(sl, tl, texts[0] if texts else "")
+        results = [None] * len(texts)
+        lines = []
+        for index, text in enumerate(texts):
+            if text.strip() and "\n" not in text:
+                lines.append(index)
+            else:
+                results[index] = self.translate(sl, tl, text)
+
+        def measure(text):
+            return len(text.encode("utf-8")) + 1
+
+        for group in self.pack_segments([texts[i] for i in lines], measure):
+            group = [lines[i] for i in group]
+            req = self.prepare(sl, tl, "\n".join(texts[i] for i in group))
+            req["chars"] = sum(len(texts[i]) for i in group)
+            resp = self.request(**req).json()
+            items = resp.get("trans_result") or []
+            if len(items) != len(group):
+                for index in group:
+                    results[index] = self.translate(sl, tl, texts[index])
+                continue
+            for index, item in zip(group, items):
+                info = {"trans_result": [item]}
+                results[index] = self._result(sl, tl, texts[index], info)
+        return results
+
+    # md5(apikey + text + salt + secret), apikey 前缀的摘要状态在构造时算好
     def sign(self, text, salt):
-        t = self.apikey + text + salt + self.secret
-        return self.md5sum(t)
+        m = self._digest.copy()
+        m.update((text + salt + self.secret).encode("utf-8"))
+        return m.hexdigest()
 
     def render(self, resp):
-        output = ""
-        result = resp["trans_result"]
-        for item in result:
-            output += "" + item["src"] + "\n"
-            output += " * " + item["dst"] + "\n"
-        return output
+        return "\n".join(item["dst"] for item in resp["trans_result"])
 
 
 # ----------------------------------------------------------------------
 # 词霸
 # ----------------------------------------------------------------------
 class CibaTranslator(BasicTranslator):
+    max_chars = 1000
+
     def __init__(self, **argv):
         super().__init__("ciba", **argv)
 
-    def translate(self, sl, tl, text):
-        sl, tl = self.guess_language(sl, tl, text)
-        url = "https://fy.iciba.com/ajax.php"
+    @override
+    def prepare(self, sl, tl, text):
+        url = self._config.get("url") or "https://fy.iciba.com/ajax.php"
         req = {}
         req["a"] = "fy"
         req["f"] = sl
         req["t"] = tl
         req["w"] = text
-        r = self.http_get(url, req, None)
+        return {"url": url, "data": req}
+
+    @override
+    def parse(self, sl, tl, text, r):
         if not r:
             return None
         try:
             resp = r.json()
         except Exception:
             return None
-        resp = r.json()
         if not resp:
             return None
         res = self.create_translation(sl, tl, text)
@@ -624,6 +2837,11 @@ class DeepLXTranslator(BasicTranslator):
     see: https://linux.do/t/topic/111737
     """
 
+    requires = ("url",)
+    batch_size = 50
+    batch_chars = 3000
+    max_chars = 3000
+
     def __init__(self, **argv):
         super().__init__("deeplx", **argv)
         self._agent = (
@@ -632,6 +2850,9 @@ class DeepLXTranslator(BasicTranslator):
         )
         self.apikey = self._config.get("apikey")
         self.url = self._config.get("url")
+        self.static_headers = {"Content-type": "application/json"}
+        if self.apikey:
+            self.static_headers["Authorization"] = f"Bearer {self.apikey}"
         if not self.url:
             sys.stderr.write(f"{RED}missing url in [deeplx] section{RESET}\n")
             sys.exit(-2)
@@ -663,8 +2884,7 @@ class DeepLXTranslator(BasicTranslator):
                 return lang
 
     @override
-    def translate(self, sl, tl, text):
-        sl, tl = self.guess_language(sl, tl, text)
+    def prepare(self, sl, tl, text):
         sl = self._switch_source_lang(sl)
         tl = self._switch_target_lang(tl)
         url = self.url
@@ -674,29 +2894,66 @@ class DeepLXTranslator(BasicTranslator):
             req["source_lang"] = sl
         req["target_lang"] = tl
 
-        headers = {
-            "Content-type": "application/json",
-        }
-        if self.apikey:
-            headers["Authorization"] = f"Bearer {self.apikey}"
+        return {"url": url, "json": req, "post": True}
 
-        r = self.http_post(url, json=req, headers=headers)
+    def _decode(self, r):
+        if r is None:
+            return None
         if not r:
-            sys.stderr.write(f"{RED}{json.loads(r.text)['message']}{RESET}\n")
+            try:
+                message = r.json()["message"]
+            except Exception:
+                message = "deeplx: HTTP {}".format(r.status_code)
+            sys.stderr.write(f"{RED}{message}{RESET}\n")
             return None
         try:
-            resp = r.json()
+            return r.json()
         except Exception:
             return None
+
+    # DeepL 的语言代码只用于请求, 结果里保留 guess_language 的代码
+    @override
+    def parse(self, sl, tl, text, r):
+        resp = self._decode(r)
+        if resp is None:
+            return None
+        return self._result(sl, tl, text, resp["data"], resp)
+
+    def _result(self, sl, tl, text, translation, resp=None):
         res = self.create_translation(sl, tl, text)
-        res["text"] = text
-        res["sl"] = sl
-        res["tl"] = tl
-        del res["explain"]
-        res["translation"] = resp["data"]
-        res["alternative"] = self.get_alternative(resp)
+        res["definition"] = translation
+        if resp and self.wants("alternative"):
+            res["alternative"] = self.get_alternative(resp)
         return res
 
+    # 多个片段用换行拼接, 译文按行拆回; 行数对不上时逐条重试
+    @override
+    def translate_many(self, sl, tl, texts):
+        sl, tl = self.guess_language(sl, tl, texts[0] if texts else "")
+        results = [None] * len(texts)
+        lines = []
+        for index, text in enumerate(texts):
+            if text.strip() and "\n" not in text:
+                lines.append(index)
+            else:
+                results[index] = self.translate(sl, tl, text)
+        for group in self.pack_segments([texts[i] for i in lines]):
+            group = [lines[i] for i in group]
+            if len(group) == 1:
+                results[group[0]] = self.translate(sl, tl, texts[group[0]])
+                continue
+            req = self.prepare(sl, tl, "\n".join(texts[i] for i in group))
+            req["chars"] = sum(len(texts[i]) for i in group)
+            resp = self._decode(self.request(**req))
+            parts = ((resp or {}).get("data") or "").split("\n")
+            if len(parts) != len(group):
+                for index in group:
+                    results[index] = self.translate(sl, tl, texts[index])
+                continue
+            for index, part in zip(group, parts):
+                results[index] = self._result(sl, tl, texts[index], part)
+        return results
+
     def get_alternative(self, resp):
         if not resp.get("alternatives"):
             return None
@@ -745,6 +3002,1285 @@ ENGINES = {
 }
 
 
+# ----------------------------------------------------------------------
+# 批量翻译: 逐行读取, 有界线程池并发请求, 按输入顺序输出 JSONL 或 msgpack
+# ----------------------------------------------------------------------
+OUTPUT_FORMATS = ("text", "json", "jsonl", "msgpack")
+
+
+# --format 优先, -json 等同于 --format=json
+def output_format(options: Dict[str, str]) -> str:
+    return options.get("format") or ("json" if "json" in options else "text")
+
+
+# 写出一条结构化记录: json 单个文档, jsonl 每条一行, msgpack 首尾相接的对象流
+def write_record(res: Any, fmt: str = "jsonl", output=None) -> None:
+    if output is None:
+        output = sys.stdout
+    if fmt == "msgpack":
+        import msgpack
+
+        output.flush()
+        getattr(output, "buffer", output).write(msgpack.packb(res, use_bin_type=True))
+    elif fmt == "json":
+        output.write(json.dumps(res))
+    else:
+        output.write(json.dumps(res, ensure_ascii=False) + "\n")
+    output.flush()
+
+
+def iter_ordered(fn, items, workers: int = 8):
+    from collections import deque
+    from concurrent.futures import ThreadPoolExecutor
+
+    workers = max(1, workers)
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        pending: Any = deque()
+        for item in items:
+            pending.append(executor.submit(fn, item))
+            if len(pending) >= workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+def translate_batch(
+    translator: BasicTranslator,
+    sl: str,
+    tl: str,
+    lines,
+    workers: int = 8,
+    output=None,
+    fmt: str = "jsonl",
+) -> int:
+    if output is None:
+        output = sys.stdout
+
+    # 引擎支持数组请求时, 每个任务携带 batch_size 行
+    size = 1
+    if type(translator).translate_many is not BasicTranslator.translate_many:
+        size = int(translator._config.get("batch_size") or translator.batch_size)
+
+    def chunks():
+        chunk: List[str] = []
+        for line in lines:
+            chunk.append(line.rstrip("\r\n"))
+            if len(chunk) >= size:
+                yield chunk
+                chunk = []
+        if chunk:
+            yield chunk
+
+    def work(chunk: List[str]) -> List[Optional[Dict[str, Any]]]:
+        texts = [text for text in chunk if text.strip()]
+        try:
+            found = translator.lookup_many(sl, tl, texts) if texts else []
+        except Exception as e:
+            found = [{"text": text, "error": str(e)} for text in texts]
+        found = [r or {"text": t, "error": "no result"} for t, r in zip(texts, found)]
+        results = iter(found)
+        return [next(results) if text.strip() else None for text in chunk]
+
+    failed = 0
+    for res in (r for rs in iter_ordered(work, chunks(), workers) for r in rs):
+        if res is not None and "error" in res:
+            failed += 1
+        write_record(res, fmt, output)
+    return failed
+
+
+# 异步批量: 单线程事件循环, 最多 workers 个请求同时在途
+async def atranslate_batch(
+    translator: BasicTranslator,
+    sl: str,
+    tl: str,
+    lines,
+    workers: int = 64,
+    output=None,
+    fmt: str = "jsonl",
+) -> int:
+    import asyncio
+    from collections import deque
+
+    if output is None:
+        output = sys.stdout
+
+    async def work(line: str) -> Optional[Dict[str, Any]]:
+        text = line.rstrip("\r\n")
+        if not text.strip():
+            return None
+        try:
+            res = await translator.alookup(sl, tl, text)
+        except Exception as e:
+            return {"text": text, "error": str(e)}
+        return res or {"text": text, "error": "no result"}
+
+    failed = 0
+    pending: Any = deque()
+
+    async def flush(count: int) -> None:
+        nonlocal failed
+        while len(pending) > count:
+            res = await pending.popleft()
+            if res is not None and "error" in res:
+                failed += 1
+            write_record(res, fmt, output)
+
+    try:
+        for line in lines:
+            pending.append(asyncio.ensure_future(work(line)))
+            await flush(max(1, workers) - 1)
+        await flush(0)
+    finally:
+        await AsyncHttpPool.close()
+    return failed
+
+
+# ----------------------------------------------------------------------
+# 多引擎: race 返回最先成功的结果, all 收集所有引擎的结果
+# ----------------------------------------------------------------------
+# 没有任何结果字段 (如词典查不到句子) 视为失败
+def has_result(res: Optional[Dict[str, Any]]) -> bool:
+    return res is not None and any(res.get(field) for field in FIELDS)
+
+
+def _engine_lookup(name: str, sl: str, tl: str, text: str, **argv: Any):
+    try:
+        return ENGINES[name](**argv).lookup(sl, tl, text)
+    except SystemExit:
+        return None  # 引擎缺少配置
+    except Exception as e:
+        sys.stderr.write(f"{RED}{name}: {e}{RESET}\n")
+        return None
+
+
+# 落后的请求在守护线程中被丢弃, 不会拖住进程退出
+def translate_race(
+    names: List[str], sl: str, tl: str, text: str, **argv: Any
+) -> Optional[Dict[str, Any]]:
+    import queue
+
+    results: Any = queue.Queue()
+
+    def work(name: str) -> None:
+        results.put(_engine_lookup(name, sl, tl, text, **argv))
+
+    for name in names:
+        threading.Thread(target=work, args=(name,), daemon=True).start()
+    for _ in names:
+        res = results.get()
+        if has_result(res):
+            return res
+    return None
+
+
+def translate_all(
+    names: List[str], sl: str, tl: str, text: str, **argv: Any
+) -> Dict[str, Optional[Dict[str, Any]]]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=max(1, len(names))) as executor:
+        futures = [
+            executor.submit(_engine_lookup, name, sl, tl, text, **argv)
+            for name in names
+        ]
+        return {name: f.result() for name, f in zip(names, futures)}
+
+
+# ----------------------------------------------------------------------
+# 文件翻译: 解析 Markdown / SRT / PO / JSON, 只提取需要翻译的片段 (代码块,
+# 时间轴, 键名等原样保留), 去重后批量翻译, 写出结构相同的文件. 旁边的
+# .tstate 文件按内容哈希记录已有译文, 再次运行时只翻译变化的片段
+# ----------------------------------------------------------------------
+class DocumentTemplate:
+    """Literal text interleaved with translatable segments.
+
+    ``render`` joins the literal parts with the translations, passing each
+    translation through ``escape`` (line-based formats fold newlines).
+    """
+
+    LETTER = re.compile(r"[^\W\d_]")
+
+    def __init__(self, escape: Any = None) -> None:
+        self.parts: List[Any] = []
+        self.segments: List[str] = []
+        self.escape = escape or (lambda x: " ".join(x.splitlines()))
+
+    def text(self, value: str) -> None:
+        self.parts.append(value)
+
+    # 首尾空白原样保留, 没有字母的片段 (数字, 符号) 不翻译
+    def segment(self, value: str) -> None:
+        body = value.strip()
+        if not self.LETTER.search(body):
+            self.parts.append(self.escape(value))
+            return
+        start = value.index(body)
+        self.parts.append(self.escape(value[:start]))
+        self.parts.append(len(self.segments))
+        self.segments.append(body)
+        self.parts.append(self.escape(value[start + len(body) :]))
+
+    def render(self, translations: List[str]) -> str:
+        return "".join(
+            self.escape(translations[p]) if isinstance(p, int) else p
+            for p in self.parts
+        )
+
+
+_MD_FENCE = re.compile(r"^\s*(```|~~~)")
+_MD_LITERAL = re.compile(
+    r"^\s*(?:<|\[[^\]]+\]:\s|([-*_=])(?:\s*\1){2,}\s*$|\|?\s*:?-{3,}:?\s*(?:\|\s*:?-{3,}:?\s*)*\|?\s*$)"
+)
+_MD_PREFIX = re.compile(
+    r"^(\s*(?:(?:#{1,6}|>|[-*+](?:\s+\[[ xX]\])?|\d+[.)])(?:\s+|$))*)(.*)$", re.S
+)
+
+
+def parse_markdown(content: str) -> DocumentTemplate:
+    doc = DocumentTemplate()
+    fence = None
+    code = False
+    blank = True
+    lines = content.splitlines(keepends=True)
+    for index, line in enumerate(lines):
+        body = line.rstrip("\r\n")
+        end = line[len(body) :]
+        # front matter
+        if index == 0 and body.strip() == "---":
+            fence = "---"
+            doc.text(line)
+            continue
+        if fence is not None:
+            doc.text(line)
+            if (fence == "---" and body.strip() in ("---", "...")) or (
+                fence != "---" and body.strip().startswith(fence)
+            ):
+                fence = None
+            continue
+        m = _MD_FENCE.match(body)
+        if m:
+            fence = m.group(1)
+            doc.text(line)
+            continue
+        # 缩进代码块: 空行之后缩进 4 格, 且不是嵌套列表
+        indented = body.startswith(("    ", "\t")) and body.strip()
+        if indented and (blank or code) and not _MD_PREFIX.match(body).group(1).strip():
+            code = True
+            doc.text(line)
+            continue
+        code = code and not body.strip()
+        blank = not body.strip()
+        if blank or _MD_LITERAL.match(body):
+            doc.text(line)
+            continue
+        if body.lstrip().startswith("|"):
+            cells = body.split("|")
+            for i, cell in enumerate(cells):
+                if i:
+                    doc.text("|")
+                doc.segment(cell)
+            doc.text(end)
+            continue
+        prefix, rest = _MD_PREFIX.match(body).groups()
+        doc.text(prefix)
+        doc.segment(rest)
+        doc.text(end)
+    return doc
+
+
+def parse_srt(content: str) -> DocumentTemplate:
+    doc = DocumentTemplate()
+    expect = "index"
+    for line in content.splitlines(keepends=True):
+        body = line.rstrip("\r\n")
+        end = line[len(body) :]
+        if not body.strip():
+            expect = "index"
+            doc.text(line)
+        elif expect == "index" and body.strip().lstrip("\ufeff").isdigit():
+            expect = "time"
+            doc.text(line)
+        elif "-->" in body and expect in ("index", "time"):
+            expect = "text"
+            doc.text(line)
+        else:
+            doc.segment(body)
+            doc.text(end)
+    return doc
+
+
+def _po_unquote(value: str) -> str:
+    value = value.strip()
+    if len(value) >= 2 and value[0] == value[-1] == '"':
+        value = value[1:-1]
+    escapes = {"n": "\n", "t": "\t", '"': '"', "\\": "\\", "r": "\r"}
+    return re.sub(r"\\(.)", lambda m: escapes.get(m.group(1), m.group(1)), value)
+
+
+def _po_quote(value: str) -> str:
+    value = value.replace("\\", "\\\\").replace('"', '\\"')
+    return value.replace("\t", "\\t").replace("\r", "\\r").replace("\n", "\\n")
+
+
+# 只翻译 msgstr 为空的条目, 头部条目和已有译文保持不变
+def parse_po(content: str) -> DocumentTemplate:
+    doc = DocumentTemplate(escape=_po_quote)
+    entries = re.split(r"(?:\r?\n){2,}", content)
+    seps = re.findall(r"(?:\r?\n){2,}", content)
+    field = re.compile(
+        r"^(msgctxt|msgid|msgid_plural|msgstr(?:\[\d+\])?)\s+(\".*\")\s*$"
+    )
+    for index, entry in enumerate(entries):
+        lines = entry.splitlines()
+        fields: Dict[str, str] = {}
+        kept: List[str] = []
+        key = None
+        for line in lines:
+            m = field.match(line)
+            if m:
+                key = m.group(1)
+                fields[key] = _po_unquote(m.group(2))
+            elif key is not None and line.strip().startswith('"'):
+                fields[key] += _po_unquote(line)
+                if not key.startswith("msgstr"):
+                    kept.append(line)
+                continue
+            else:
+                key = None
+            if key is None or not key.startswith("msgstr"):
+                kept.append(line)
+        strs = [k for k in fields if k.startswith("msgstr")]
+        empty = strs and not any(fields[k] for k in strs)
+        if not fields.get("msgid") or not empty:
+            doc.text(entry)
+        else:
+            newline = "\r\n" if "\r\n" in entry else "\n"
+            tail = entry[len(entry.rstrip("\r\n")) :]
+            doc.text(newline.join(kept) + newline)
+            for k in strs:
+                source = fields["msgid"]
+                if k != "msgstr" and k != "msgstr[0]":
+                    source = fields.get("msgid_plural", source)
+                doc.text(f'{k} "')
+                doc.segment(source)
+                doc.text('"' + (newline if k != strs[-1] else tail))
+        if index < len(seps):
+            doc.text(seps[index])
+    return doc
+
+
+_JSON_STRING = re.compile(r'"(?:[^"\\]|\\.)*"')
+_JSON_KEY = re.compile(r"\s*:")
+
+
+# i18n JSON: 只翻译字符串值, 键名不变; 译文原位替换字符串字面量,
+# 缩进, 分隔符和其他值保持原样
+def parse_json(content: str) -> DocumentTemplate:
+    json.loads(content)
+    doc = DocumentTemplate(escape=lambda x: json.dumps(x, ensure_ascii=False)[1:-1])
+    pos = 0
+    for m in _JSON_STRING.finditer(content):
+        value = json.loads(m.group(0))
+        if _JSON_KEY.match(content, m.end()) or not doc.LETTER.search(value):
+            continue
+        doc.text(content[pos : m.start() + 1])
+        doc.segment(value)
+        doc.text('"')
+        pos = m.end()
+    doc.text(content[pos:])
+    return doc
+
+
+DOCUMENT_FORMATS = {
+    "md": parse_markdown,
+    "markdown": parse_markdown,
+    "srt": parse_srt,
+    "po": parse_po,
+    "pot": parse_po,
+    "json": parse_json,
+}
+
+
+# 按输入顺序翻译片段, 返回定义字段 (失败为 None)
+def translate_segments(
+    translator: BasicTranslator, sl: str, tl: str, texts: List[str], workers: int = 8
+) -> List[Optional[str]]:
+    size = 1
+    if type(translator).translate_many is not BasicTranslator.translate_many:
+        size = int(translator._config.get("batch_size") or translator.batch_size)
+    chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+
+    def work(chunk: List[str]) -> List[Optional[Dict[str, Any]]]:
+        try:
+            return translator.lookup_many(sl, tl, chunk)
+        except Exception as e:
+            sys.stderr.write(f"{RED}{e}{RESET}\n")
+            return [None] * len(chunk)
+
+    out: List[Optional[str]] = []
+    for found in iter_ordered(work, chunks, workers):
+        for res in found:
+            value = (res or {}).get("definition")
+            out.append(value.rstrip("\n") if isinstance(value, str) and value else None)
+    return out
+
+
+def translate_file(
+    translator: BasicTranslator,
+    sl: str,
+    tl: str,
+    src: str,
+    dst: str,
+    kind: Optional[str] = None,
+    workers: int = 8,
+) -> Dict[str, int]:
+    import hashlib
+
+    kind = (kind or Path(src).suffix.lstrip(".")).lower()
+    if kind not in DOCUMENT_FORMATS:
+        raise ValueError(f"unsupported file format: {kind}")
+    with open(src, encoding="utf-8", newline="") as fh:
+        doc = DOCUMENT_FORMATS[kind](fh.read())
+
+    # 状态文件: {"engine", "sl", "tl", "segments": {sha1(原文): 译文}}
+    state_path = Path(dst + ".tstate")
+    known: Dict[str, str] = {}
+    if state_path.exists():
+        try:
+            state = json.loads(state_path.read_text(encoding="utf-8"))
+        except ValueError:
+            state = {}
+        if (state.get("engine"), state.get("sl"), state.get("tl")) == (
+            translator.cache_name(),
+            sl,
+            tl,
+        ):
+            known = state.get("segments") or {}
+
+    def digest(text: str) -> str:
+        return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+    unique = list(dict.fromkeys(doc.segments))
+    pending = [x for x in unique if digest(x) not in known]
+    fresh = translate_segments(translator, sl, tl, pending, workers)
+    failed = 0
+    for text, value in zip(pending, fresh):
+        if value is None:
+            failed += 1
+        else:
+            known[digest(text)] = value
+    translations = [known.get(digest(x), x) for x in doc.segments]
+    with open(dst, "w", encoding="utf-8", newline="") as fh:
+        fh.write(doc.render(translations))
+    state = {"engine": translator.cache_name(), "sl": sl, "tl": tl}
+    state["segments"] = {
+        digest(x): known[digest(x)] for x in unique if digest(x) in known
+    }
+    state_path.write_text(json.dumps(state, ensure_ascii=False), encoding="utf-8")
+    return {
+        "segments": len(doc.segments),
+        "unique": len(unique),
+        "translated": len(pending) - failed,
+        "reused": len(unique) - len(pending),
+        "failed": failed,
+    }
+
+
+# ----------------------------------------------------------------------
+# 自动选择引擎 (--engine=auto): 按最近的延迟和错误率 (指数加权平均, 保存在
+# 多进程共享的状态文件中) 选择支持该语言对的最快健康引擎, 并定期探测其他引擎
+# ----------------------------------------------------------------------
+class EngineHealth:
+    """Rolling latency and error rate per engine, shared through a JSON file.
+
+    config ([auto] section of config.toml):
+        engines = "google,bing,youdao"  # candidates, default every configured engine
+        path = "~/.cache/translator/health.json"
+        alpha = 0.3            # weight of the newest sample
+        probe_interval = 300   # seconds before an engine is measured again
+        max_error = 0.5        # error rate above which an engine is avoided
+    """
+
+    _instance: Optional["EngineHealth"] = None
+    _instance_lock = threading.Lock()
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        alpha: float = 0.3,
+        probe_interval: float = 300,
+        max_error: float = 0.5,
+    ) -> None:
+        self.path = Path(path).expanduser() if path else None
+        self.alpha = alpha
+        self.probe_interval = probe_interval
+        self.max_error = max_error
+        self.state: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls) -> "EngineHealth":
+        with cls._instance_lock:
+            if cls._instance is None:
+                config = (load_config() or {}).get("auto", {})
+                cls._instance = cls(
+                    config.get("path") or "~/.cache/translator/health.json",
+                    float(config.get("alpha") or 0.3),
+                    float(config.get("probe_interval") or 300),
+                    float(config.get("max_error") or 0.5),
+                )
+        return cls._instance
+
+    # 读取-修改-写回状态文件, 文件不可用时只在进程内记录
+    def _update(self, fn: Any) -> Any:
+        with self._lock:
+            if self.path is None:
+                return fn(self.state)
+            try:
+                import fcntl
+            except ImportError:
+                return fn(self.state)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a+") as fh:
+                    fcntl.flock(fh, fcntl.LOCK_EX)
+                    try:
+                        fh.seek(0)
+                        try:
+                            self.state = json.loads(fh.read() or "{}")
+                        except ValueError:
+                            self.state = {}
+                        result = fn(self.state)
+                        fh.seek(0)
+                        fh.truncate()
+                        fh.write(json.dumps(self.state))
+                        fh.flush()
+                    finally:
+                        fcntl.flock(fh, fcntl.LOCK_UN)
+                return result
+            except OSError:
+                return fn(self.state)
+
+    # 失败不更新延迟 (超时会把延迟拉得过高), 只提高错误率
+    def record(self, name: str, seconds: float, failed: bool) -> None:
+        def apply(states: Dict[str, Dict[str, float]]) -> None:
+            stat = states.setdefault(name, {})
+            alpha = self.alpha if stat.get("samples") else 1.0
+            if not failed:
+                latency = stat.get("latency", seconds)
+                stat["latency"] = latency + alpha * (seconds - latency)
+            error = stat.get("error", 0.0)
+            stat["error"] = error + alpha * ((1.0 if failed else 0.0) - error)
+            stat["samples"] = stat.get("samples", 0) + 1
+            stat["updated"] = time.time()
+
+        self._update(apply)
+
+    # Instrument 钩子: 每次未命中缓存的翻译都是一个样本
+    def __call__(self, record: Dict[str, Any]) -> None:
+        status = record["status"]
+        failed = bool(record["error"]) or status == "error"
+        if isinstance(status, int) and status >= 400:
+            failed = True
+        self.record(record["engine"], record["phases"].get("total", 0.0), failed)
+
+    # 排序: 过期或从未测量的引擎先探测一次, 然后按 延迟 * (1 + 错误率) 排序,
+    # 错误率过高或熔断中的引擎排在最后
+    def rank(self, translators: List[BasicTranslator]) -> List[BasicTranslator]:
+        def apply(states: Dict[str, Dict[str, float]]) -> List[BasicTranslator]:
+            now = time.time()
+            probe = None
+            for translator in translators:
+                stat = states.get(translator._name, {})
+                last = max(stat.get("updated", 0.0), stat.get("probed", 0.0))
+                if now - last >= self.probe_interval:
+                    probe = translator
+                    states.setdefault(translator._name, {})["probed"] = now
+                    break
+
+            def score(translator: BasicTranslator) -> Tuple[int, float]:
+                stat = states.get(translator._name, {})
+                error = stat.get("error", 0.0)
+                unhealthy = error > self.max_error or translator.get_breaker().is_open()
+                latency = stat.get("latency", float("inf"))
+                return (1 if unhealthy else 0), latency * (1 + error)
+
+            ordered = sorted(translators, key=score)
+            if probe is not None:
+                ordered.remove(probe)
+                ordered.insert(0, probe)
+            return ordered
+
+        return self._update(apply)
+
+
+# 语言代码去掉地区部分, zh-CN/zh-CHS/zh-CHT 都视为 zh
+def language_base(lang: str) -> str:
+    return lang.lower().replace("_", "-").split("-")[0]
+
+
+def engine_configured(name: str) -> bool:
+    config = (load_config() or {}).get(name, {})
+    return all(config.get(key) for key in ENGINES[name].requires)
+
+
+# 候选引擎: [auto] engines 或全部已配置的引擎, 过滤掉不支持语言对的
+def auto_engines(sl: str, tl: str, text: str, **argv: Any) -> List[BasicTranslator]:
+    config = (load_config() or {}).get("auto", {})
+    names = [n.strip() for n in (config.get("engines") or "").split(",") if n.strip()]
+    translators = []
+    phrase = len(text.split()) > 1
+    for name in names or list(ENGINES):
+        if name not in ENGINES or not engine_configured(name):
+            continue
+        if phrase and ENGINES[name].words_only:
+            continue
+        try:
+            translator = ENGINES[name](**argv)
+        except SystemExit:
+            continue
+        xsl, xtl = translator.guess_language(sl, tl, text)
+        langs = translator.languages
+        if langs is not None:
+            pair = {language_base(xsl), language_base(xtl)} - {"auto"}
+            if not pair <= langs:
+                continue
+        translators.append(translator)
+    return translators
+
+
+def translate_auto(
+    sl: str, tl: str, text: str, **argv: Any
+) -> Optional[Dict[str, Any]]:
+    health = EngineHealth.open()
+    Instrument.add_hook(health)
+    for translator in health.rank(auto_engines(sl, tl, text, **argv)):
+        try:
+            res = translator.lookup(sl, tl, text)
+        except Exception as e:
+            sys.stderr.write(f"{RED}{translator._name}: {e}{RESET}\n")
+            continue
+        # 空结果换下一个引擎
+        if has_result(res):
+            return res
+    return None
+
+
+# ----------------------------------------------------------------------
+# 守护进程: 常驻内存保留引擎实例和连接, 命令行作为瘦客户端转发请求
+#   unix socket: 每行一个 JSON 请求, 每行一个 JSON 响应
+#   host:port:   HTTP, POST /translate (JSON 请求体) 或 GET /translate?text=..
+# 请求: {"engine": "google", "sl": "auto", "tl": "auto", "text": "..",
+#        "mode": "race"|"all", "options": {"cache": true, "refresh": false}}
+# 响应: {"result": {...}} 或 {"error": ".."}
+# ----------------------------------------------------------------------
+DAEMON_ADDRESS = "~/.cache/translator/daemon.sock"
+
+
+def daemon_address(options: Dict[str, str]) -> str:
+    address = options.get("daemon") or os.environ.get("TRANSLATOR_DAEMON")
+    if not address:
+        config = load_config() or {}
+        address = config.get("daemon", {}).get("address") or DAEMON_ADDRESS
+    return address
+
+
+# "8765" / "127.0.0.1:8765" 为 TCP, 其余视为 unix socket 路径
+def parse_address(address: str) -> Tuple[str, Any]:
+    host, _, port = address.rpartition(":")
+    if "/" not in address and port.isdigit():
+        return "tcp", (host or "127.0.0.1", int(port))
+    return "unix", str(Path(address).expanduser())
+
+
+class TranslatorDaemon:
+    def __init__(self) -> None:
+        self._engines: Dict[Tuple[str, str], BasicTranslator] = {}
+        self._lock = threading.Lock()
+        self.metrics = Metrics()
+
+    # 每个 (引擎, 构造选项) 保留一个常驻实例
+    def engine(self, name: str, options: Dict[str, Any]) -> BasicTranslator:
+        key = (name, json.dumps(options, sort_keys=True))
+        with self._lock:
+            translator = self._engines.get(key)
+            if translator is None:
+                translator = ENGINES[name](**options)
+                self._engines[key] = translator
+        return translator
+
+    def handle(self, req: Dict[str, Any]) -> Dict[str, Any]:
+        if req.get("op") == "metrics":
+            return {"metrics": self.metrics.render()}
+        try:
+            text = str(req.get("text") or "")
+            sl = str(req.get("sl") or "auto")
+            tl = str(req.get("tl") or "auto")
+            options = dict(req.get("options") or {})
+            options.setdefault("cache", config_bool(req.get("cache"), True))
+            options.setdefault("refresh", config_bool(req.get("refresh"), False))
+            engine = str(req.get("engine") or "google")
+            names = [n.strip() for n in engine.split(",") if n.strip()]
+            for name in names:
+                if name not in ENGINES and names != ["auto"]:
+                    return {"error": "bad engine name: " + name}
+            if not text:
+                return {"error": "empty text"}
+            targets = [x.strip() for x in tl.split(",") if x.strip()]
+            if len(targets) > 1:
+                if len(names) > 1 or names == ["auto"]:
+                    return {"error": "multiple targets take a single engine"}
+                translator = self.engine(names[0], options)
+                return {"result": translator.lookup_targets(sl, targets, text)}
+            if names == ["auto"]:
+                return {"result": translate_auto(sl, tl, text, **options)}
+            if len(names) > 1:
+                if req.get("mode") == "all":
+                    return {"result": translate_all(names, sl, tl, text, **options)}
+                return {"result": translate_race(names, sl, tl, text, **options)}
+            translator = self.engine(names[0], options)
+            return {"result": translator.lookup(sl, tl, text)}
+        except SystemExit:
+            return {"error": "engine is not configured"}
+        except Exception as e:
+            return {"error": str(e)}
+
+    def serve(self, address: str) -> int:
+        import http.server
+        import socketserver
+
+        daemon = self
+        kind, addr = parse_address(address)
+
+        class StreamHandler(socketserver.StreamRequestHandler):
+            def handle(self) -> None:
+                for line in self.rfile:
+                    try:
+                        req = json.loads(line)
+                    except ValueError:
+                        res = {"error": "bad request"}
+                    else:
+                        res = daemon.handle(req)
+                    self.wfile.write(json.dumps(res).encode("utf-8") + b"\n")
+                    self.wfile.flush()
+
+        class HttpHandler(http.server.BaseHTTPRequestHandler):
+            def log_message(self, format: str, *args: Any) -> None:
+                pass
+
+            def reply(self, code: int, res: Dict[str, Any]) -> None:
+                body = json.dumps(res).encode("utf-8")
+                self.send_response(code)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self) -> None:
+                from urllib.parse import parse_qsl, urlsplit
+
+                url = urlsplit(self.path)
+                if url.path == "/metrics":
+                    body = daemon.metrics.render().encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/plain; version=0.0.4")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                if url.path != "/translate":
+                    return self.reply(404, {"error": "not found"})
+                self.reply(200, daemon.handle(dict(parse_qsl(url.query))))
+
+            def do_POST(self) -> None:
+                if self.path != "/translate":
+                    return self.reply(404, {"error": "not found"})
+                size = int(self.headers.get("Content-Length") or 0)
+                try:
+                    req = json.loads(self.rfile.read(size) or b"{}")
+                except ValueError:
+                    return self.reply(400, {"error": "bad request"})
+                self.reply(200, daemon.handle(req))
+
+        server: Any
+        if kind == "tcp":
+            server = http.server.ThreadingHTTPServer(addr, HttpHandler)
+        else:
+            if daemon_request(address, {}) is not None:
+                sys.stderr.write(f"{RED}daemon already running: {addr}{RESET}\n")
+                return -1
+            Path(addr).parent.mkdir(parents=True, exist_ok=True)
+            if os.path.exists(addr):
+                os.unlink(addr)
+            server = socketserver.ThreadingUnixStreamServer(addr, StreamHandler)
+            server.daemon_threads = True
+        sys.stderr.write(f"translator daemon listening on {address}\n")
+        Instrument.add_hook(self.metrics)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            Instrument.remove_hook(self.metrics)
+            server.server_close()
+            if kind == "unix" and os.path.exists(addr):
+                os.unlink(addr)
+        return 0
+
+
+# 转发给守护进程, 守护进程未运行时返回 None
+def daemon_request(
+    address: str, req: Dict[str, Any], timeout: float = 60
+) -> Optional[Dict[str, Any]]:
+    import socket
+
+    kind, addr = parse_address(address)
+    try:
+        if kind == "tcp":
+            import http.client
+
+            conn = http.client.HTTPConnection(addr[0], addr[1], timeout=timeout)
+            try:
+                conn.request(
+                    "POST",
+                    "/translate",
+                    json.dumps(req),
+                    {"Content-Type": "application/json"},
+                )
+                return json.loads(conn.getresponse().read())
+            finally:
+                conn.close()
+        if not os.path.exists(addr):
+            return None
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.settimeout(timeout)
+            sock.connect(addr)
+            sock.sendall(json.dumps(req).encode("utf-8") + b"\n")
+            with sock.makefile("rb") as fh:
+                line = fh.readline()
+        return json.loads(line) if line else None
+    except (OSError, ValueError):
+        return None
+
+
+# ----------------------------------------------------------------------
+# 启动耗时: 模块加载, 配置解析, 网络库导入, 引擎初始化
+# ----------------------------------------------------------------------
+def profile_startup(names: List[str]) -> int:
+    timings: List[Tuple[str, float]] = []
+    timings.append(("module", time.perf_counter() - _MODULE_START))
+    modules = len(sys.modules)
+    ts = time.perf_counter()
+    load_config()
+    timings.append(("config", time.perf_counter() - ts))
+    ts = time.perf_counter()
+    import requests  # type: ignore [import-untyped]  # noqa: F401
+
+    timings.append(("import requests", time.perf_counter() - ts))
+    for name in names:
+        ts = time.perf_counter()
+        try:
+            ENGINES[name]()
+        except SystemExit:
+            pass
+        timings.append((f"init {name}", time.perf_counter() - ts))
+    for name, cost in timings:
+        sys.stderr.write(f"{name:<20} {cost * 1000:8.2f} ms\n")
+    sys.stderr.write(f"{'modules':<20} {modules:8d} -> {len(sys.modules)}\n")
+    return 0
+
+
+# ----------------------------------------------------------------------
+# 性能测试: 本地 HTTP 服务模拟各引擎的接口, 统计每个引擎在每种执行方式下的
+# 延迟分位数, 吞吐, 每个结果的 CPU 时间和内存分配
+# ----------------------------------------------------------------------
+class MockProvider:
+    """Local stand-in for the translation services, used by --benchmark.
+
+    Every request waits ``latency`` seconds plus up to ``jitter`` and fails
+    with HTTP 503 at ``error_rate``; the body mimics the engine named by the
+    first path component (``/google``, ``/youdao``, ``/baidu``, ...).
+    """
+
+    def __init__(
+        self, latency: float = 0.02, jitter: float = 0.0, error_rate: float = 0.0
+    ) -> None:
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.hits = 0
+        self._server: Any = None
+
+    def start(self) -> str:
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # 和真实服务一样保持连接, 才能测到连接复用
+            protocol_version = "HTTP/1.1"
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                self.reply()
+
+            def do_POST(self):
+                self.reply()
+
+            def reply(self):
+                size = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(size) if size else b""
+                status, ctype, out = provider.respond(self.path, body)
+                self.send_response(status)
+                self.send_header("Content-Type", ctype)
+                self.send_header("Content-Length", str(len(out)))
+                self.end_headers()
+                self.wfile.write(out)
+
+        class Server(ThreadingHTTPServer):
+            daemon_threads = True
+            request_queue_size = 1024
+
+        self._server = Server(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return "http://127.0.0.1:{}".format(self._server.server_address[1])
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+
+    # 把所有引擎指向本地服务的配置
+    def config(self, base: str) -> Dict[str, Dict[str, str]]:
+        config = {name: {"url": f"{base}/{name}"} for name in ENGINES}
+        config["google"]["url"] += "/translate_a/single"
+        # BingDict 读取的配置节是 [bingdict]
+        config["bingdict"] = config.pop("bing")
+        for name in ("azure", "baidu", "deeplx"):
+            config[name]["apikey"] = "benchmark"
+        config["baidu"]["secret"] = "benchmark"
+        config["default"] = {"retries": "0", "breaker_threshold": "0"}
+        return config
+
+    def respond(self, path: str, body: bytes) -> Tuple[int, str, bytes]:
+        import random
+        from urllib.parse import parse_qs, urlparse
+
+        self.hits += 1
+        time.sleep(self.latency + random.uniform(0, self.jitter))
+        if self.error_rate and random.random() < self.error_rate:
+            return 503, "text/plain", b"unavailable"
+        url = urlparse(path)
+        engine = url.path.strip("/").split("/")[0]
+        form = parse_qs(url.query)
+        try:
+            if body[:1] in (b"{", b"["):
+                payload: Any = json.loads(body)
+            else:
+                form.update(parse_qs(body.decode("utf-8")))
+                payload = None
+        except ValueError:
+            return 400, "text/plain", b"bad request"
+
+        def arg(key: str) -> str:
+            return (form.get(key) or [""])[0]
+
+        if engine == "google":
+            text = arg("q")
+            out: Any = [
+                [["译:" + text, text, None, None, 10], [None, None, "yì", "ˈtekst"]],
+                [["noun", ["译"], [["译", [text]], ["文本", [text]]], text, 1]],
+                "en",
+                None,
+                None,
+                [[text, None, [["译:" + text, 1000], ["文:" + text, 0]], [[0, 1]]]],
+                None,
+                None,
+                [],
+                None,
+                None,
+                None,
+                [["noun", [["a piece of text", "m_1", "example " + text]], text]],
+            ]
+        elif engine == "youdao":
+            text = arg("i")
+            out = {
+                "translateResult": [[{"src": text, "tgt": "译:" + text}]],
+                "smartResult": {"entries": ["", "n. 译;文本\r\n"]},
+            }
+        elif engine == "baidu":
+            lines = arg("q").split("\n")
+            out = {"trans_result": [{"src": x, "dst": "译:" + x} for x in lines]}
+        elif engine == "azure":
+            tos = form.get("to") or ["zh-Hans"]
+            out = [
+                {"translations": [{"text": "译:" + x["text"], "to": to} for to in tos]}
+                for x in payload
+            ]
+        elif engine == "deeplx":
+            # 批量请求按行翻译, 和真实服务一样
+            text = payload["text"]
+            data = "\n".join("译:" + x for x in text.split("\n"))
+            out = {"code": 200, "data": data, "alternatives": ["文:" + text]}
+        elif engine == "ciba":
+            out = {"status": 1, "content": {"out": "译:" + arg("w"), "ph_en": "ˈtekst"}}
+        elif engine == "bing":
+            html = '<span class="ht_attr" lang="en">[ˈtekst] </span>'
+            html += '<span class="ht_pos">n.</span><span class="ht_trs">文本</span>'
+            return 200, "text/html; charset=utf-8", html.encode("utf-8")
+        else:
+            return 404, "text/plain", b"unknown engine"
+        return 200, "application/json", json.dumps(out).encode("utf-8")
+
+
+BENCHMARK_MODES = ("sync", "threads", "async", "batch")
+
+_BENCHMARK_TEXTS = [
+    "hello",
+    "translation",
+    "The quick brown fox jumps over the lazy dog.",
+    "Please restart the service after changing the configuration file.",
+]
+
+
+def _percentile(values: List[float], q: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+# 按 mode 翻译 texts, 返回 (每个结果的延迟, 失败数)
+# 模拟服务的译文都以 "译:" 开头, 词典引擎只有 explain
+def _benchmark_ok(res: Optional[Dict[str, Any]]) -> bool:
+    if not res:
+        return False
+    return str(res.get("definition") or "").startswith("译:") or bool(
+        res.get("explain")
+    )
+
+
+def _benchmark_run(
+    translator: BasicTranslator, mode: str, texts: List[str], workers: int
+) -> Tuple[List[float], int]:
+    from concurrent.futures import ThreadPoolExecutor
+
+    def timed(text: str) -> Tuple[float, bool]:
+        ts = time.perf_counter()
+        try:
+            ok = _benchmark_ok(translator.lookup("en", "zh-CN", text))
+        except Exception:
+            ok = False
+        return time.perf_counter() - ts, ok
+
+    def timed_many(chunk: List[str]) -> List[Tuple[float, bool]]:
+        ts = time.perf_counter()
+        try:
+            found = translator.lookup_many("en", "zh-CN", chunk)
+        except Exception:
+            found = [None] * len(chunk)
+        cost = time.perf_counter() - ts
+        return [(cost, _benchmark_ok(r)) for r in found]
+
+    async def atimed(text: str, semaphore: Any) -> Tuple[float, bool]:
+        async with semaphore:
+            ts = time.perf_counter()
+            try:
+                ok = _benchmark_ok(await translator.alookup("en", "zh-CN", text))
+            except Exception:
+                ok = False
+            return time.perf_counter() - ts, ok
+
+    async def arun() -> List[Tuple[float, bool]]:
+        import asyncio
+
+        semaphore = asyncio.Semaphore(workers)
+        try:
+            return await asyncio.gather(*(atimed(t, semaphore) for t in texts))
+        finally:
+            await AsyncHttpPool.close()
+
+    if mode == "sync":
+        samples = [timed(text) for text in texts]
+    elif mode == "threads":
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            samples = list(executor.map(timed, texts))
+    elif mode == "async":
+        import asyncio
+
+        samples = asyncio.run(arun())
+    else:
+        size = int(translator._config.get("batch_size") or translator.batch_size)
+        chunks = [texts[i : i + size] for i in range(0, len(texts), size)]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            samples = [x for xs in executor.map(timed_many, chunks) for x in xs]
+    return [cost for cost, _ in samples], sum(1 for _, ok in samples if not ok)
+
+
+def run_benchmark(
+    names: List[str],
+    modes: List[str],
+    count: int = 200,
+    workers: int = 16,
+    latency: float = 0.02,
+    jitter: float = 0.0,
+    error_rate: float = 0.0,
+) -> List[Dict[str, Any]]:
+    import gc
+    import tempfile
+    import tracemalloc
+
+    global CONFIG_PATH
+    provider = MockProvider(latency, jitter, error_rate)
+    base = provider.start()
+    saved = CONFIG_PATH
+    # 熔断器和限速器按引擎名在进程内共享, 结束后恢复, 不带走测试配置
+    breakers = dict(CircuitBreaker._breakers)
+    limiters = dict(RateLimiter._limiters)
+    records: List[Dict[str, Any]] = []
+    with tempfile.TemporaryDirectory() as tmp:
+        CONFIG_PATH = os.path.join(tmp, "config.toml")
+        with open(CONFIG_PATH, "w", encoding="utf-8") as fh:
+            for section, values in provider.config(base).items():
+                fh.write(f"[{section}]\n")
+                for key, value in values.items():
+                    fh.write(f"{key} = {json.dumps(value)}\n")
+        load_config.cache_clear()
+        try:
+            for name in names:
+                translator = ENGINES[name](cache=False, memory=False)
+                for mode in modes:
+                    if mode == "async" and not _has_module("aiohttp"):
+                        sys.stderr.write(f"{RED}async: aiohttp missing{RESET}\n")
+                        continue
+                    tag = f"{name}-{mode}-{time.time_ns()}"
+                    texts = [
+                        f"{_BENCHMARK_TEXTS[i % len(_BENCHMARK_TEXTS)]} {tag}-{i}"
+                        for i in range(count)
+                    ]
+                    gc.collect()
+                    hits = provider.hits
+                    cpu = time.process_time()
+                    ts = time.perf_counter()
+                    costs, errors = _benchmark_run(translator, mode, texts, workers)
+                    wall = time.perf_counter() - ts
+                    cpu = time.process_time() - cpu
+                    hits = provider.hits - hits
+                    # 内存单独跑一小轮, 避免 tracemalloc 拖慢计时
+                    sample = [t + "-m" for t in texts[: min(count, 20)]]
+                    tracemalloc.start()
+                    _benchmark_run(translator, mode, sample, workers)
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+                    records.append(
+                        {
+                            "engine": name,
+                            "mode": mode,
+                            "results": count,
+                            "errors": errors,
+                            "upstream": hits,
+                            "p50_ms": round(_percentile(costs, 0.50) * 1000, 2),
+                            "p95_ms": round(_percentile(costs, 0.95) * 1000, 2),
+                            "p99_ms": round(_percentile(costs, 0.99) * 1000, 2),
+                            "rps": round(count / wall, 1) if wall else 0.0,
+                            "cpu_ms": round(cpu * 1000 / max(1, count), 3),
+                            "mem_kb": round(peak / 1024 / max(1, len(sample)), 1),
+                        }
+                    )
+        finally:
+            CONFIG_PATH = saved
+            load_config.cache_clear()
+            CircuitBreaker._breakers.clear()
+            CircuitBreaker._breakers.update(breakers)
+            RateLimiter._limiters.clear()
+            RateLimiter._limiters.update(limiters)
+            provider.stop()
+    return records
+
+
+def _has_module(name: str) -> bool:
+    import importlib.util
+
+    return importlib.util.find_spec(name) is not None
+
+
+def print_benchmark(records: List[Dict[str, Any]], fmt: str = "text") -> None:
+    if fmt != "text":
+        for record in records:
+            write_record(record, fmt)
+        return
+    keys = ["engine", "mode", "results", "errors", "upstream"]
+    keys += ["p50_ms", "p95_ms", "p99_ms", "rps", "cpu_ms", "mem_kb"]
+    print(" ".join(f"{k:>9}" for k in keys))
+    for record in records:
+        print(" ".join(f"{record[k]:>9}" for k in keys))
+
+
+# BingDict 解析微基准用的样例页面: hover 接口的原始响应, 以及后面带有
+# 脚本和样式的完整页面
+def _bingdict_samples() -> Dict[str, bytes]:
+    head = '<div class="ht_attrs"><span class="ht_attr" lang="en-us">[heˈloʊ] </span>'
+    head += '<span class="ht_attr" lang="en">[həˈləʊ] </span></div><ul>'
+    items = [("int.", "你好；喂；您好；哈喽"), ("n.", "“喂”的招呼声或问候声")]
+    items += [("v.", "打招呼；说（或大声说）“喂”"), ("网络", "哈罗；哈啰；大家好")]
+    body = "".join(
+        f'<li><span class="ht_pos">{a}</span><span class="ht_trs">{b}</span></li>'
+        for a, b in items
+    )
+    hover = head + body + "</ul>"
+    chrome = "".join(
+        f'<script type="text/javascript">//<![CDATA[\nvar _w{i}={{"id":{i},'
+        f'"name":"module{i}","deps":["a","b"]}};\n//]]></script>\n'
+        f"<style>.b_mod{i}{{margin:{i}px;padding:0}}</style>\n"
+        for i in range(400)
+    )
+    page = "<!DOCTYPE html><html><body>" + hover + chrome + "</body></html>"
+    return {"hover": hover.encode("utf-8"), "page": page.encode("utf-8")}
+
+
+# 比较原来的整页解码 + re.findall 和 BingDict.read_page 每页的耗时 (微秒);
+# path 是保存的 SerpHoverTrans 响应目录 (*.html), 没有时使用内置样例
+def bench_bingdict(path: Optional[str], rounds: int = 2000) -> List[Dict[str, Any]]:
+    if path:
+        pages = {x.name: x.read_bytes() for x in sorted(Path(path).glob("*.html"))}
+    else:
+        pages = _bingdict_samples()
+    engine = BingDict.__new__(BingDict)
+
+    # 改动前的实现: 每次用模式字符串对整页 findall
+    def legacy(html: str) -> Tuple[Optional[str], List[str]]:
+        m = re.findall(r'<span class="ht_attr" lang=".*?">\[(.*?)\] </span>', html)
+        pattern = r'<span class="ht_pos">(.*?)</span><span class="ht_trs">(.*?)</span>'
+        return (m[0].strip() if m else None), [
+            "%s %s" % x for x in re.findall(pattern, html)
+        ]
+
+    records = []
+    for name, content in pages.items():
+        resp = HttpResponse(200, {"Content-Length": str(len(content))}, content)
+        ts = time.perf_counter()
+        for _ in range(rounds):
+            before_found = legacy(resp.text)
+        before = (time.perf_counter() - ts) / rounds
+        ts = time.perf_counter()
+        for _ in range(rounds):
+            found = engine.read_page(resp)
+        after = (time.perf_counter() - ts) / rounds
+        if before_found != found:
+            sys.stderr.write(f"{RED}{name}: results differ{RESET}\n")
+        record = {"page": name, "bytes": len(content)}
+        record["findall_us"] = round(before * 1e6, 2)
+        record["read_us"] = round(after * 1e6, 2)
+        record["speedup"] = round(before / after, 2) if after else 0
+        records.append(record)
+    return records
+
+
 # ----------------------------------------------------------------------
 # 主程序
 # ----------------------------------------------------------------------
@@ -753,6 +4289,42 @@ def main(argv: Optional[List[str]] = None) -> int:
         argv = sys.argv
     argv = [n for n in argv]
     options, args = getopt(argv[1:])
+    # --stats/--metrics/--trace 观察的是本进程, 不转发给守护进程
+    hooks: List[Any] = []
+    metrics = None
+    if "stats" in options or options.get("metrics"):
+        metrics = Metrics()
+        hooks.append(metrics)
+    if options.get("trace"):
+        hooks.append(TraceWriter(options["trace"]))
+    if hooks:
+        options["no-daemon"] = ""
+    # --record=dir / --replay=dir {--latency=ms} {--jitter=ms}
+    for mode in ("record", "replay"):
+        if options.get(mode):
+            latency = float(options.get("latency") or 0) / 1000
+            jitter = float(options.get("jitter") or 0) / 1000
+            HttpPool.use(FixtureStore(options[mode], mode, latency, jitter))
+            options["no-daemon"] = ""
+    for hook in hooks:
+        Instrument.add_hook(hook)
+    try:
+        return dispatch(options, args)
+    finally:
+        if HttpPool.fixtures is not None:
+            HttpPool.use(None)
+        for hook in hooks:
+            Instrument.remove_hook(hook)
+            if isinstance(hook, TraceWriter):
+                hook.close()
+        if metrics is not None and "stats" in options:
+            sys.stderr.write(metrics.summary() + "\n")
+        if metrics is not None and options.get("metrics"):
+            with open(os.path.expanduser(options["metrics"]), "w") as fh:
+                fh.write(metrics.render())
+
+
+def dispatch(options: Dict[str, str], args: List[str]) -> int:
     engine = options.get("engine")
     if not engine:
         engine = "google"
@@ -762,21 +4334,239 @@ def main(argv: Optional[List[str]] = None) -> int:
     tl = options.get("to")
     if not tl:
         tl = "auto"
-    if not args:
+    if "profile-startup" in options:
+        names = [n.strip() for n in engine.split(",") if n.strip() in ENGINES]
+        return profile_startup(names)
+    if "bench-bingdict" in options:
+        records = bench_bingdict(
+            options["bench-bingdict"] or None, int(options.get("rounds") or 2000)
+        )
+        fmt = output_format(options)
+        if fmt != "text":
+            for record in records:
+                write_record(record, fmt)
+            return 0
+        keys = ["page", "bytes", "findall_us", "read_us", "speedup"]
+        print(" ".join(f"{k:>10}" for k in keys))
+        for record in records:
+            print(" ".join(f"{record[k]:>10}" for k in keys))
+        return 0
+    if "benchmark" in options:
+        names = [n.strip() for n in options.get("engine", "").split(",") if n.strip()]
+        modes = (options.get("modes") or ",".join(BENCHMARK_MODES)).split(",")
+        for name in names:
+            if name not in ENGINES:
+                print("bad engine name: " + name)
+                return -1
+        for mode in modes:
+            if mode not in BENCHMARK_MODES:
+                print("bad mode: " + mode)
+                return -1
+        records = run_benchmark(
+            names or list(ENGINES),
+            modes,
+            count=int(options["benchmark"] or 200),
+            workers=int(options.get("workers") or 16),
+            latency=float(options.get("latency") or 20) / 1000,
+            jitter=float(options.get("jitter") or 0) / 1000,
+            error_rate=float(options.get("error-rate") or 0),
+        )
+        print_benchmark(records, output_format(options))
+        return 0
+    if "serve" in options:
+        address = options["serve"] or daemon_address(options)
+        return TranslatorDaemon().serve(address)
+    if "file" in options and not args:
+        args = [options["file"]]
+    if "help" in options or "h" in options or (not args and "batch" not in options):
         msg = "usage: translator.py {--engine=xx} {--from=xx} {--to=xx}"
-        print(msg + " {-json} text")
+        print(msg + " {--no-cache} {--refresh} {--memory} {--dt=t,..} {--fields=a,b}")
+        print("       {--format=text|json|jsonl|msgpack} {-json} text")
+        print("fields:", ", ".join(FIELDS))
+        print("       translator.py {--engine=xx,yy,...} {--race|--all} text")
+        print("       translator.py --engine=auto text")
+        print("       translator.py {--engine=xx} --to=de,fr,ja text")
+        print("       translator.py --to=xx --file=doc.md|srt|po|json {--output=path}")
+        print("       translator.py {--serve[=socket|host:port]} {--no-daemon}")
+        print("       translator.py {--engine=xx} --profile-startup")
+        print("       {--stats} {--trace=file.jsonl} {--metrics=file.prom} ...")
+        print("       translator.py {--engine=xx,..} --benchmark[=n] {--modes=a,b}")
+        print("                     {--workers=n} {--latency=ms} {--error-rate=0.x}")
+        print("       translator.py --bench-bingdict[=dir] {--rounds=n}")
+        print("       {--record=dir | --replay=dir {--latency=ms} {--jitter=ms}} ...")
+        print("       translator.py {--batch[=file]} {--workers=n} {--async} < lines")
         print("engines:", list(ENGINES.keys()))
         return 0
     text = " ".join(args)
-    cls = ENGINES.get(engine)
-    if not cls:
-        print("bad engine name: " + engine)
+    names = [n.strip() for n in engine.split(",") if n.strip()]
+    for name in names:
+        if name not in ENGINES and names != ["auto"]:
+            print("bad engine name: " + name)
+            return -1
+    targets = [x.strip() for x in tl.split(",") if x.strip()]
+    if len(targets) > 1 and (len(names) > 1 or names == ["auto"]):
+        print("multiple targets take a single engine")
+        return -1
+    if len(targets) > 1 and ("batch" in options or "file" in options):
+        print("batch mode takes a single target")
+        return -1
+    fmt = output_format(options)
+    if fmt not in OUTPUT_FORMATS:
+        print("bad format: " + fmt)
+        return -1
+    if fmt == "msgpack":
+        try:
+            import msgpack  # noqa: F401
+        except ImportError:
+            sys.stderr.write(f"{RED}--format=msgpack requires msgpack{RESET}\n")
+            return -1
+    if "batch" in options and fmt in ("text", "json"):
+        fmt = "jsonl"
+    options["format"] = fmt
+    kwargs = {"cache": "no-cache" not in options, "refresh": "refresh" in options}
+    if options.get("dt"):
+        kwargs["dt"] = options["dt"]
+    if "memory" in options:
+        kwargs["memory"] = True
+    fields = parse_fields(options.get("fields"))
+    if fields is None and fmt == "text":
+        # 终端输出只会用到这些字段
+        fields = frozenset(["definition", "explain", "alternative"])
+        if "phonetic" in options:
+            fields |= {"phonetic"}
+    if fields is not None:
+        kwargs["fields"] = sorted(fields)
+    if "file" in options:
+        if len(names) > 1 or names == ["auto"]:
+            print("file mode takes a single engine")
+            return -1
+        # 写入文件的只有译文
+        kwargs["fields"] = ["definition"]
+        return translate_file_command(names[0], sl, tl, options, kwargs)
+    if "batch" not in options and "no-daemon" not in options:
+        req = {"engine": ",".join(names), "sl": sl, "tl": tl, "text": text}
+        req["mode"] = "all" if "all" in options else "race"
+        req["options"] = kwargs
+        res = daemon_request(daemon_address(options), req)
+        if res is not None:
+            if "error" in res:
+                sys.stderr.write(f"{RED}{res['error']}{RESET}\n")
+                return -2
+            if len(targets) > 1:
+                return print_targets(res["result"], options)
+            return print_results(names, res["result"], options)
+    if len(names) > 1:
+        if "batch" in options:
+            print("batch mode takes a single engine")
+            return -1
+        if "all" in options:
+            results = translate_all(names, sl, tl, text, **kwargs)
+            return print_results(names, results, options)
+        res = translate_race(names, sl, tl, text, **kwargs)
+        return print_result(res, options)
+    if len(targets) > 1:
+        translator = ENGINES[names[0]](**kwargs)
+        return print_targets(translator.lookup_targets(sl, targets, text), options)
+    if names == ["auto"] and "batch" not in options:
+        return print_result(translate_auto(sl, tl, text, **kwargs), options)
+    if names == ["auto"]:
+        # 批量模式开始时选定一个引擎; 各行内容未知, 不选只查单词的词典
+        health = EngineHealth.open()
+        Instrument.add_hook(health)
+        engines = auto_engines(sl, tl, "", **kwargs)
+        ranked = health.rank([t for t in engines if not t.words_only])
+        if not ranked:
+            print("no engine available")
+            return -1
+        translator = ranked[0]
+    else:
+        translator = ENGINES[names[0]](**kwargs)
+    if "batch" in options:
+        if "async" in options:
+            workers = int(options.get("workers") or 64)
+        else:
+            workers = int(
+                options.get("workers") or translator._config.get("workers", 8)
+            )
+        path = options["batch"]
+        fh = sys.stdin if not path or path == "-" else open(path, encoding="utf-8")
+        with fh:
+            if "async" in options:
+                import asyncio
+
+                coro = atranslate_batch(translator, sl, tl, fh, workers, fmt=fmt)
+                failed = asyncio.run(coro)
+            else:
+                failed = translate_batch(translator, sl, tl, fh, workers, fmt=fmt)
+        return -2 if failed else 0
+    res = translator.lookup(sl, tl, text)
+    return print_result(res, options)
+
+
+# 输出 translate_all 或单个结果
+def print_results(names: List[str], results: Any, options: Dict[str, str]) -> int:
+    if len(names) < 2 or "all" not in options:
+        return print_result(results, options)
+    fmt = output_format(options)
+    if fmt == "json":
+        write_record(results, fmt)
+        return 0
+    if fmt != "text":
+        for name, res in results.items():
+            write_record(res or {"engine": name, "error": "no result"}, fmt)
+        return 0 if any(results.values()) else -2
+    for name, res in results.items():
+        print(f"{BLUE}[{name}]{RESET}")
+        if print_result(res, options) != 0:
+            print(f"{RED}no result{RESET}")
+    return 0 if any(results.values()) else -2
+
+
+# --file=path {--output=path} {--file-format=md|srt|po|json}
+def translate_file_command(
+    name: str, sl: str, tl: str, options: Dict[str, str], kwargs: Dict[str, Any]
+) -> int:
+    src = options["file"]
+    if tl == "auto":
+        print("file mode needs --to")
+        return -1
+    dst = options.get("output")
+    if not dst:
+        path = Path(src)
+        dst = str(path.with_name(f"{path.stem}.{tl}{path.suffix}"))
+    translator = ENGINES[name](**kwargs)
+    workers = int(options.get("workers") or translator._config.get("workers", 8))
+    try:
+        stats = translate_file(
+            translator, sl, tl, src, dst, options.get("file-format"), workers
+        )
+    except (OSError, ValueError) as e:
+        sys.stderr.write(f"{RED}{e}{RESET}\n")
         return -1
-    translator = cls()
-    res = translator.translate(sl, tl, text)
-    if "json" in options:
-        text = json.dumps(res)
-        sys.stdout.write(str(text))
+    summary = ", ".join(f"{v} {k}" for k, v in stats.items())
+    sys.stderr.write(f"{dst}: {summary}\n")
+    return -2 if stats["failed"] else 0
+
+
+# 输出 lookup_targets 的结果, 按目标语言分组
+def print_targets(results: Dict[str, Any], options: Dict[str, str]) -> int:
+    fmt = output_format(options)
+    if fmt == "json":
+        write_record(results, fmt)
+        return 0
+    for tl, res in results.items():
+        if fmt != "text":
+            write_record(res or {"tl": tl, "error": "no result"}, fmt)
+            continue
+        print(f"{BLUE}[{tl}]{RESET}")
+        if print_result(res, options) != 0:
+            print(f"{RED}no result{RESET}")
+    return 0 if any(results.values()) else -2
+
+
+def print_result(res: Optional[Dict[str, Any]], options: Dict[str, str]) -> int:
+    if output_format(options) != "text":
+        write_record(res, output_format(options))
         return 0
     if not res:
         return -2
@@ -792,9 +4582,6 @@ def main(argv: Optional[List[str]] = None) -> int:
     if "explain" in res:
         if res["explain"]:
             print("\n".join(res["explain"]))
-    elif "translation" in res:
-        if res["translation"]:
-            print(res["translation"])
     if "alternative" in res:
         if res["alternative"]:
             print(f"{GREEN}alternative:{RESET}")
@@ -833,7 +4620,7 @@ if __name__ == "__main__":
         import pprint
 
         pprint.pprint(r)
-        print(r["translation"])
+        print(r["definition"])
         return 0
 
     def test4():
@@ -841,7 +4628,7 @@ if __name__ == "__main__":
         r = t.translate("", "japanese", "吃饭没有？")
         # print(r['info'])
         # print()
-        print(r["translation"])
+        print(r["definition"])
 
     def test5():
         t = BaiduTranslator()
@@ -849,7 +4636,7 @@ if __name__ == "__main__":
         import pprint
 
         pprint.pprint(r)
-        print(r["translation"])
+        print(r["definition"])
         return 0
 
     def test6():
@@ -857,7 +4644,7 @@ if __name__ == "__main__":
         r = t.translate("", "", "吃饭没有？")
         # print(r['info'])
         # print()
-        print(r["translation"])
+        print(r["definition"])
 
     def test7():
         # t = CibaTranslator()
@@ -867,6 +4654,8 @@ if __name__ == "__main__":
         # r = t.translate('zh', 'en', '吃饭了没有？')
         # r = t.translate('', '', 'apple')
         r = t.translate("", "", "正在测试翻译一段话")
+        import pprint
+
         pprint.pprint(r)
 
     def test9():